@@ -0,0 +1,34 @@
+"""Add daily log and user goal indexes
+
+Revision ID: b7e41c2d9a10
+Revises: 929893639541
+Create Date: 2026-10-17 10:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41c2d9a10'
+down_revision: Union[str, Sequence[str], None] = '929893639541'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tables created by Base.metadata.create_all after these indexes were added to
+    # the models already have them, hence if_not_exists.
+    op.create_index('ix_daily_logs_user_id_date', 'daily_logs', ['user_id', 'date'], unique=False, if_not_exists=True)
+    op.create_index('ix_daily_logs_user_id_food_id_date', 'daily_logs', ['user_id', 'food_id', 'date'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_user_goals_user_id'), 'user_goals', ['user_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_goals_user_id'), table_name='user_goals', if_exists=True)
+    op.drop_index('ix_daily_logs_user_id_food_id_date', table_name='daily_logs', if_exists=True)
+    op.drop_index('ix_daily_logs_user_id_date', table_name='daily_logs', if_exists=True)
@@ -0,0 +1,50 @@
+"""Add daily_totals rollup
+
+Revision ID: d41a7f3c8e25
+Revises: b7e41c2d9a10
+Create Date: 2026-10-17 11:03:27.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7f3c8e25'
+down_revision: Union[str, Sequence[str], None] = 'b7e41c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('calories', sa.Float(), nullable=False),
+        sa.Column('protein', sa.Float(), nullable=False),
+        sa.Column('carbs', sa.Float(), nullable=False),
+        sa.Column('fats', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user_profiles.id']),
+        sa.PrimaryKeyConstraint('user_id', 'date'),
+        if_not_exists=True,
+    )
+    # Backfill from existing logs (same sums as crud.rebuild_daily_totals)
+    op.execute("DELETE FROM daily_totals")
+    op.execute(
+        "INSERT INTO daily_totals (user_id, date, calories, protein, carbs, fats) "
+        "SELECT l.user_id, l.date, "
+        "COALESCE(SUM(f.calories * l.quantity), 0), COALESCE(SUM(f.protein * l.quantity), 0), "
+        "COALESCE(SUM(f.carbs * l.quantity), 0), COALESCE(SUM(f.fats * l.quantity), 0) "
+        "FROM daily_logs l JOIN foods f ON f.id = l.food_id "
+        "WHERE l.user_id IS NOT NULL AND l.date IS NOT NULL "
+        "GROUP BY l.user_id, l.date"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_totals', if_exists=True)
@@ -1,7 +1,8 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from typing import List, Dict, Any
-from app.schemas import FactOut, ChatRequest, ClassifyRequest, NutritionResult
-from app.ai.retriever import retrieve_facts
+from typing import List, Dict, Any, Optional
+from app.schemas import FactOut, ChatRequest, ClassifyRequest, NutritionResult, FactBatchRequest, FactBatchResult
+from app.ai.retriever import retrieve_facts, retrieve_facts_batch, reload_resources, get_cache_stats
 from app.ai_pipeline.nutrition_engine import classify_food
 from app.ai_pipeline.llm_integration import get_llm_explanation
 from app.ai_pipeline.enhanced_image_recognition import identify_food_from_image
@@ -10,7 +11,8 @@ from app.ai_pipeline.sugar_analysis import analyze_sugar_composition
 from app.crud import get_user_profile, get_user_goals
 from app.database import get_db
 from sqlalchemy.orm import Session
-from app.services.food_search import search_food_by_name
+from app.services.food_search import search_food_by_name_async
+from app.services.fuzzy_names import correct_food_name
 import logging
 from app.ai_pipeline.enhanced_image_recognition import food_recognizer
 import os
@@ -27,20 +29,65 @@ ACTIVITY_LEVEL_MAPPING = {
     "high": 3,
 }
 
+MAX_BATCH_QUERIES = 100
+
 @router.get("/get-nutrition-facts/", response_model=List[FactOut])
-def get_nutrition_facts(q: str, k: int = 3, current_user: models.UserProfile = Depends(auth.get_current_active_user)):
-    results = retrieve_facts(query=q, k=k)
+def get_nutrition_facts(q: str, k: int = 3, lexical_weight: Optional[float] = None,
+                        min_calories: Optional[float] = None, max_calories: Optional[float] = None,
+                        min_protein: Optional[float] = None, max_protein: Optional[float] = None,
+                        min_carbs: Optional[float] = None, max_carbs: Optional[float] = None,
+                        min_fat: Optional[float] = None, max_fat: Optional[float] = None,
+                        current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    ranges = {
+        "calories_100g": (min_calories, max_calories),
+        "protein_100g": (min_protein, max_protein),
+        "carbs_100g": (min_carbs, max_carbs),
+        "fat_100g": (min_fat, max_fat),
+    }
+    filters = {field: bounds for field, bounds in ranges.items() if bounds != (None, None)}
+    results = retrieve_facts(query=q, k=k, lexical_weight=lexical_weight, filters=filters or None)
     return results
 
+@router.post("/get-nutrition-facts/batch", response_model=List[FactBatchResult])
+def get_nutrition_facts_batch(request: FactBatchRequest, current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Retrieve facts for many foods at once (e.g. a full day's log) with one embedding call"""
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    filters = None
+    if request.filters:
+        filters = {field: (bounds.min, bounds.max) for field, bounds in request.filters.items()}
+    try:
+        batch = retrieve_facts_batch(request.queries, k=request.k, lexical_weight=request.lexical_weight, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving facts: {str(e)}")
+    return [{"query": query, "facts": facts} for query, facts in zip(request.queries, batch)]
+
+@router.post("/reload-facts/")
+def reload_nutrition_facts(current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Pick up a rebuilt FAISS index and fact file without restarting the server"""
+    try:
+        reload_resources()
+        return {"ok": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reload facts: {str(e)}")
+
+@router.get("/retrieval-cache-stats/")
+def retrieval_cache_stats(current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Hit/miss counters for the retriever's query caches"""
+    return get_cache_stats()
+
 @router.post("/classify/")
-def classify_food_endpoint(request: ClassifyRequest, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+async def classify_food_endpoint(request: ClassifyRequest, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
     try:
         user_profile = current_user
-        user_goals = get_user_goals(db, user_id=user_profile.id)
+        # Database and model calls are blocking; only the food search is awaited on the loop
+        user_goals = await asyncio.to_thread(get_user_goals, db, user_id=user_profile.id)
 
         nutrition_db = getattr(food_recognizer, 'nutrition_database', None) or getattr(food_recognizer, 'nutrition_db', None)
         
-        food_data = search_food_by_name(request.food_name)
+        food_data = await search_food_by_name_async(request.food_name)
         
         if not food_data or not food_data.get("products"):
             normalized_key = _normalize_food_name(request.food_name)
@@ -67,7 +114,7 @@ def classify_food_endpoint(request: ClassifyRequest, db: Session = Depends(get_d
         
         user_features = {"age": user_profile.age, "bmi": user_profile.weight_kg / ((user_profile.height_cm / 100) ** 2), "activity_level": ACTIVITY_LEVEL_MAPPING.get(user_profile.activity_level.lower(), 1)}
 
-        classification = classify_food(food_features, user_features, user_goals)
+        classification = await asyncio.to_thread(classify_food, food_features, user_features, user_goals)
         
         response = {"recommendation": "recommended" if classification["recommended"] else "not recommended", "health_score": classification["score"], "confidence": classification["confidence"], "explanation": classification["reasoning"], "nutritional_breakdown": classification["nutritional_breakdown"], "nutritional_details": classification["nutritional_details"]}
         
@@ -112,11 +159,11 @@ def analyze_sugar(food_name: str, total_sugar: float, nutritional_data: Dict = N
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/nutrition-analysis/")
-def comprehensive_nutrition_analysis(request: ClassifyRequest, db: Session = Depends(get_db)):
+async def comprehensive_nutrition_analysis(request: ClassifyRequest, db: Session = Depends(get_db)):
     """Complete nutrition analysis including sugar differentiation"""
     try:
         # Get basic classification (existing logic)
-        classification = classify_food_endpoint(request, db)
+        classification = await classify_food_endpoint(request, db)
         
         # Add sugar analysis if sugar data is available
         if "nutritional_details" in classification and "sugar_g" in classification["nutritional_details"]:
@@ -153,7 +200,8 @@ def _normalize_food_name(food_name: str) -> str:
     """
     Normalize food names for better database matching
     """
-    name = food_name.lower().strip()
+    # Fix typos of known foods first ("chiken breast" -> "chicken breast")
+    name = correct_food_name(food_name).lower().strip()
     
     # Remove common qualifiers and get base food
     qualifiers_to_remove = [
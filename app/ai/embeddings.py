@@ -1,50 +1,332 @@
-
+import hashlib
 import json
+import math
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 import os
+import threading
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from app.ai.fact_store import atomic_output
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+EMB_BACKENDS = ("torch", "onnx")
+
+# "onnx" encodes with an exported model through onnxruntime instead of torch
+EMB_BACKEND = os.getenv("EMB_BACKEND", "torch")
 
-def build_faiss_index(jsonl_path: str, model_name: str, index_path: str, embeddings_path: str, metadata_path: str):
+# One embedding model instance per process, shared by the retriever and index builds
+_models: dict[tuple[str, str], Any] = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(model_name: str, backend: str | None = None):
     """
-    Builds a FAISS index from the fact text in a JSONL file.
+    Return the process-wide encoder for `model_name`, loading it on first use.
+    Both backends expose SentenceTransformer's `encode()`.
     """
-    if not os.path.exists(os.path.dirname(index_path)):
-        os.makedirs(os.path.dirname(index_path))
+    backend = backend or EMB_BACKEND
+    if backend not in EMB_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {', '.join(EMB_BACKENDS)}")
+    with _models_lock:
+        if (backend, model_name) not in _models:
+            if backend == "onnx":
+                from app.ai.onnx_embeddings import OnnxEmbeddingModel, onnx_model_dir
+                _models[(backend, model_name)] = OnnxEmbeddingModel(onnx_model_dir(model_name))
+            else:
+                from sentence_transformers import SentenceTransformer
+                _models[(backend, model_name)] = SentenceTransformer(model_name)
+        return _models[(backend, model_name)]
 
-    # Load the sentence transformer model
-    model = SentenceTransformer(model_name)
+def default_facts_path(index_path: str) -> str:
+    """Row-aligned fact text store written next to the index."""
+    return os.path.join(os.path.dirname(index_path), "facts.jsonl")
 
-    # Read the fact texts and metadata from the JSONL file
-    fact_texts = []
-    metadata = []
+def index_manifest_path(index_path: str) -> str:
+    """Sidecar manifest describing how the index at `index_path` was built."""
+    return os.path.splitext(index_path)[0] + ".manifest.json"
+
+def load_manifest(index_path: str) -> dict:
+    """Load the sidecar manifest for an index, or an empty dict for legacy flat indexes."""
+    path = index_manifest_path(index_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def record_meta(record: dict) -> dict:
+    """Metadata for a fact record; older rows store the fields inline instead of under "meta"."""
+    if "meta" in record:
+        return record["meta"]
+    return {key: value for key, value in record.items() if key not in ("fact_text", "raw_data")}
+
+def fact_hash(fact_text: str, meta: dict) -> str:
+    """Content hash used to detect new, changed and deleted facts."""
+    payload = json.dumps({"fact_text": fact_text, "meta": meta}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def read_fact_records(jsonl_path: str) -> list[dict]:
+    """Read a facts JSONL file into {"fact_text", "meta", "hash"} records, dropping exact duplicates."""
+    records = []
+    seen = set()
     with open(jsonl_path, "r") as f:
         for line in f:
+            if not line.strip():
+                continue
             data = json.loads(line)
-            fact_texts.append(data["fact_text"])
-            metadata.append(data["meta"])
+            meta = record_meta(data)
+            digest = fact_hash(data["fact_text"], meta)
+            if digest in seen:
+                continue
+            seen.add(digest)
+            records.append({"fact_text": data["fact_text"], "meta": meta, "hash": digest})
+    return records
 
-    # Encode the fact texts into embeddings
-    print("Encoding fact texts...")
-    embeddings = model.encode(fact_texts, convert_to_numpy=True, show_progress_bar=True)
+def apply_search_params(index, manifest: dict):
+    """Apply search-time parameters (nprobe / efSearch) recorded in the manifest."""
+    params = manifest.get("params", {})
+    index_type = manifest.get("index_type", "flat")
 
-    # Normalize the embeddings to unit length
-    faiss.normalize_L2(embeddings)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = int(params.get("nprobe", 1))
+    elif index_type == "hnsw":
+        hnsw_index = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        hnsw_index.hnsw.efSearch = int(params.get("ef_search", 16))
 
-    # Build the FAISS index
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings)
+def create_index(dim: int, num_vectors: int, index_type: str = "flat", nlist: int | None = None,
+                 pq_m: int = 16, pq_nbits: int = 8, hnsw_m: int = 32, ef_construction: int = 200):
+    """
+    Create an empty inner-product FAISS index of the requested type.
+    Returns the index and the parameters that were actually used.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {', '.join(INDEX_TYPES)}")
+
+    params: dict[str, int] = {}
+
+    # Flat and HNSW indexes are wrapped in an ID map so row ids stay stable
+    # across incremental appends and removals; IVF indexes support ids natively.
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim)), params
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        params.update(hnsw_m=hnsw_m, ef_construction=ef_construction)
+        return faiss.IndexIDMap2(index), params
+
+    # IVF variants: ~4*sqrt(N) lists is the usual starting point
+    if nlist is None:
+        nlist = int(4 * math.sqrt(num_vectors))
+    nlist = max(1, min(nlist, num_vectors))
+    quantizer = faiss.IndexFlatIP(dim)
+    params["nlist"] = nlist
+
+    if index_type == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT), params
+
+    if dim % pq_m != 0:
+        raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+    # PQ training needs at least 2**nbits points per sub-quantizer
+    pq_nbits = max(1, min(pq_nbits, int(math.log2(max(num_vectors, 2)))))
+    params.update(pq_m=pq_m, pq_nbits=pq_nbits)
+    return faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits, faiss.METRIC_INNER_PRODUCT), params
 
-    # Save the index, embeddings, and metadata
+def train_index(index, embeddings: np.ndarray, train_sample_size: int = 100_000, seed: int = 42):
+    """Train the index (IVF/PQ) on a random sample of the embeddings."""
+    if index.is_trained:
+        return
+    sample = embeddings
+    if len(embeddings) > train_sample_size:
+        rng = np.random.default_rng(seed)
+        sample = embeddings[rng.choice(len(embeddings), train_sample_size, replace=False)]
+    print(f"Training index on {len(sample)} vectors...")
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+
+def _encode(model, texts: list[str]) -> np.ndarray:
+    """Encode fact texts into unit-length float32 embeddings."""
+    print(f"Encoding {len(texts)} fact texts...")
+    embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+def _save_index_files(index, embeddings: np.ndarray, rows: Sequence[dict | None], manifest: dict,
+                      index_path: str, embeddings_path: str, metadata_path: str, facts_path: str):
+    """
+    Write the index, embeddings and the row-aligned metadata/fact files.
+    Tombstoned rows (None) are kept so row ids stay stable.
+    """
+    # Workers may have the index, embeddings and fact store memory-mapped
+    # (FAISS_MMAP), so each file is replaced, never rewritten in place
     print(f"Saving FAISS index to {index_path}")
-    faiss.write_index(index, index_path)
+    with atomic_output(index_path) as tmp_path:
+        faiss.write_index(index, tmp_path)
 
     print(f"Saving embeddings to {embeddings_path}")
-    np.save(embeddings_path, embeddings)
+    with atomic_output(embeddings_path) as tmp_path, open(tmp_path, "wb") as f:
+        np.save(f, embeddings)
 
     print(f"Saving metadata to {metadata_path}")
-    with open(metadata_path, "w") as f:
-        for m in metadata:
-            f.write(json.dumps(m) + "\n")
+    with atomic_output(metadata_path) as tmp_path, open(tmp_path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row["meta"] if row else None) + "\n")
+
+    print(f"Saving fact texts to {facts_path}")
+    with atomic_output(facts_path) as tmp_path, open(tmp_path, "w") as f:
+        for row in rows:
+            if row:
+                f.write(json.dumps({"fact_text": row["fact_text"], "hash": row["hash"]}) + "\n")
+            else:
+                f.write(json.dumps({"fact_text": "", "hash": None, "deleted": True}) + "\n")
+
+    manifest_path = index_manifest_path(index_path)
+    print(f"Saving index manifest to {manifest_path}")
+    with atomic_output(manifest_path) as tmp_path, open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+def _load_index_rows(metadata_path: str, facts_path: str) -> list[dict | None]:
+    """Read back the row-aligned metadata/fact files written by a previous build."""
+    rows: list[dict | None] = []
+    with open(metadata_path, "r") as meta_file, open(facts_path, "r") as facts_file:
+        for meta_line, fact_line in zip(meta_file, facts_file):
+            meta = json.loads(meta_line)
+            fact = json.loads(fact_line)
+            if meta is None or fact.get("deleted"):
+                rows.append(None)
+            else:
+                rows.append({"fact_text": fact["fact_text"], "meta": meta, "hash": fact["hash"]})
+    return rows
+
+def build_faiss_index(jsonl_path: str, model_name: str, index_path: str, embeddings_path: str, metadata_path: str,
+                      index_type: str = "flat", nlist: int | None = None, nprobe: int = 8,
+                      pq_m: int = 16, pq_nbits: int = 8, hnsw_m: int = 32, ef_construction: int = 200,
+                      ef_search: int = 64, train_sample_size: int = 100_000,
+                      incremental: bool = False, facts_path: str | None = None):
+    """
+    Builds a FAISS index from the fact text in a JSONL file.
+
+    `index_type` selects between exact search ("flat") and approximate
+    indexes for large catalogs ("ivf_flat", "ivf_pq", "hnsw"). The choice and
+    its search-time parameters are written to a sidecar manifest next to the
+    index so the retriever can load it correctly.
+
+    With `incremental=True` an existing index is updated in place: only facts
+    whose content hash is new are encoded and appended, and facts that are no
+    longer in the JSONL are tombstoned. Falls back to a full build when there
+    is no compatible index to update.
+    """
+    if not os.path.exists(os.path.dirname(index_path)):
+        os.makedirs(os.path.dirname(index_path))
+    facts_path = facts_path or default_facts_path(index_path)
+
+    # Read the fact texts and metadata from the JSONL file
+    records = read_fact_records(jsonl_path)
+
+    if incremental:
+        manifest = load_manifest(index_path)
+        compatible = (
+            manifest.get("id_mapped")
+            and manifest.get("model") == model_name
+            and manifest.get("index_type") == index_type
+            and all(os.path.exists(p) for p in (index_path, embeddings_path, metadata_path, facts_path))
+        )
+        if compatible:
+            return _update_faiss_index(records, get_embedding_model(model_name), manifest,
+                                       index_path, embeddings_path, metadata_path, facts_path)
+        print("No compatible index to update incrementally, doing a full build.")
+
+    # Load the sentence transformer model
+    model = get_embedding_model(model_name)
+
+    # Encode the fact texts into normalized embeddings
+    embeddings = _encode(model, [record["fact_text"] for record in records])
+
+    # Build the FAISS index
+    print(f"Building '{index_type}' index...")
+    index, params = create_index(
+        embeddings.shape[1], len(embeddings), index_type=index_type, nlist=nlist,
+        pq_m=pq_m, pq_nbits=pq_nbits, hnsw_m=hnsw_m, ef_construction=ef_construction,
+    )
+    train_index(index, embeddings, train_sample_size=train_sample_size)
+    index.add_with_ids(embeddings, np.arange(len(embeddings), dtype=np.int64))
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        params.update(nprobe=min(nprobe, params["nlist"]), train_sample_size=train_sample_size)
+    elif index_type == "hnsw":
+        params["ef_search"] = ef_search
+
+    manifest = {
+        "index_type": index_type,
+        "metric": "inner_product",
+        "dim": int(embeddings.shape[1]),
+        "count": int(index.ntotal),
+        "rows": len(records),
+        "tombstones": 0,
+        "tombstones_in_index": 0,
+        "id_mapped": True,
+        "model": model_name,
+        "facts_path": facts_path,
+        "params": params,
+        "built_at": datetime.utcnow().isoformat(),
+    }
+
+    # Save the index, embeddings, metadata, fact texts and manifest
+    _save_index_files(index, embeddings, records, manifest,
+                      index_path, embeddings_path, metadata_path, facts_path)
 
     print("Index building complete.")
+    return manifest
+
+def _update_faiss_index(records: list[dict], model, manifest: dict, index_path: str,
+                        embeddings_path: str, metadata_path: str, facts_path: str) -> dict:
+    """
+    Apply the difference between `records` and the indexed rows: append new or
+    changed facts with add_with_ids and tombstone removed ones.
+
+    IVF centroids are not retrained, so an occasional full rebuild is still
+    worthwhile after large catalog changes.
+    """
+    index = faiss.read_index(index_path)
+    embeddings = np.load(embeddings_path)
+    rows = _load_index_rows(metadata_path, facts_path)
+
+    live = {row["hash"]: row_id for row_id, row in enumerate(rows) if row}
+    wanted = {record["hash"] for record in records}
+
+    new_records = [record for record in records if record["hash"] not in live]
+    deleted_ids = np.array([row_id for digest, row_id in live.items() if digest not in wanted], dtype=np.int64)
+
+    print(f"Incremental update: {len(new_records)} new/changed, {len(deleted_ids)} removed, "
+          f"{len(live) - len(deleted_ids)} unchanged")
+
+    if len(deleted_ids):
+        for row_id in deleted_ids:
+            rows[row_id] = None
+        try:
+            index.remove_ids(faiss.IDSelectorBatch(deleted_ids))
+        except RuntimeError:
+            # HNSW cannot remove vectors; the retriever filters tombstoned rows instead
+            manifest["tombstones_in_index"] = manifest.get("tombstones_in_index", 0) + len(deleted_ids)
+
+    if new_records:
+        new_embeddings = _encode(model, [record["fact_text"] for record in new_records])
+        new_ids = np.arange(len(rows), len(rows) + len(new_records), dtype=np.int64)
+        index.add_with_ids(new_embeddings, new_ids)
+        embeddings = np.vstack([embeddings, new_embeddings])
+        rows.extend(new_records)
+
+    manifest.update(
+        count=int(index.ntotal),
+        rows=len(rows),
+        tombstones=sum(1 for row in rows if row is None),
+        facts_path=facts_path,
+        updated_at=datetime.utcnow().isoformat(),
+    )
+
+    if new_records or len(deleted_ids):
+        _save_index_files(index, embeddings, rows, manifest,
+                          index_path, embeddings_path, metadata_path, facts_path)
+    print("Incremental index update complete.")
+    return manifest
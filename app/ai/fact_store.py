@@ -0,0 +1,108 @@
+import json
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def atomic_output(path: str):
+    """
+    Temporary path to write a new version of `path` to; it replaces `path`
+    with os.replace once the block succeeds. Never rewrite a file that a
+    server may have memory-mapped in place: truncating it kills every
+    process still reading the old mapping (SIGBUS). After a replace those
+    processes keep the old inode until they reload, and the reload maps
+    the new file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FactStore:
+    """
+    Memory-mapped, offset-indexed view over a JSONL fact file.
+
+    Line start offsets are computed once, so fetching the fact for a given
+    row is a single slice of the mapped file instead of a rescan.
+    """
+
+    def __init__(self, path: str, field: str = "fact_text"):
+        self.path = path
+        self.field = field
+        self._lock = threading.Lock()
+        self._file: BinaryIO | None = None
+        self._mmap: mmap.mmap | None = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def reload(self):
+        """(Re)map the file and rebuild the line offset table."""
+        with self._lock:
+            self._close()
+
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                logger.warning(f"Fact store {self.path} is missing or empty")
+                self._offsets = np.zeros(1, dtype=np.int64)
+                return
+
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            data = np.frombuffer(self._mmap, dtype=np.uint8)
+            newlines = np.flatnonzero(data == ord("\n")) + 1
+            del data  # release the buffer export so the mmap can be closed later
+
+            if len(newlines) == 0 or newlines[-1] != len(self._mmap):
+                # Last line has no trailing newline
+                newlines = np.append(newlines, len(self._mmap))
+
+            self._offsets = np.concatenate(([0], newlines)).astype(np.int64)
+            logger.info(f"Fact store loaded {len(self)} rows from {self.path}")
+
+    def get_record(self, row: int) -> dict:
+        """Return the parsed JSON record at the given row."""
+        with self._lock:
+            if self._mmap is None or row < 0 or row >= len(self):
+                raise IndexError(f"Fact row {row} out of range")
+            start, end = self._offsets[row], self._offsets[row + 1]
+            line = self._mmap[start:end].strip()
+        return json.loads(line) if line else {}
+
+    def get(self, row: int, default: str = "") -> str:
+        """Return the fact text at the given row, or `default` if unavailable."""
+        try:
+            return self.get_record(row).get(self.field, default)
+        except (IndexError, ValueError):
+            return default
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
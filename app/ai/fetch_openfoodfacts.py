@@ -1,10 +1,20 @@
 
 import argparse
+import csv
+import gzip
+import itertools
 import json
 import time
 import requests
 import sqlite3
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Also run as a script (python app/ai/fetch_openfoodfacts.py)
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from app.ai.fact_store import atomic_output
 
 # Define the canonical nutrient keys
 CANONICAL_NUTRIENTS = {
@@ -14,6 +24,19 @@ CANONICAL_NUTRIENTS = {
     "fat_100g": "fat_100g",
 }
 
+FOODS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS foods (
+        id INTEGER PRIMARY KEY,
+        name TEXT,
+        barcode TEXT,
+        url TEXT,
+        calories_100g REAL,
+        protein_100g REAL,
+        carbs_100g REAL,
+        fat_100g REAL
+    )
+'''
+
 def get_food_data(food_name: str, max_retries: int = 3, delay: int = 1):
     """
     Fetches food data from the Open Food Facts API for a given food name.
@@ -82,8 +105,8 @@ def seed_data(seed_terms: list[str]):
     if not os.path.exists("data"):
         os.makedirs("data")
 
-    # Cache to JSONL file
-    with open("data/nutrition_facts.jsonl", "w") as f:
+    # Cache to JSONL file (replaced, not rewritten: older indexes serve facts from it memory-mapped)
+    with atomic_output("data/nutrition_facts.jsonl") as tmp_path, open(tmp_path, "w") as f:
         for term in seed_terms:
             product = get_food_data(term)
             if product:
@@ -96,18 +119,7 @@ def seed_data(seed_terms: list[str]):
     # Cache to SQLite
     conn = sqlite3.connect("data/app.db")
     c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS foods (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            barcode TEXT,
-            url TEXT,
-            calories_100g REAL,
-            protein_100g REAL,
-            carbs_100g REAL,
-            fat_100g REAL
-        )
-    ''')
+    c.execute(FOODS_TABLE_SQL)
     
     with open("data/nutrition_facts.jsonl", "r") as f:
         for line in f:
@@ -129,11 +141,260 @@ def seed_data(seed_terms: list[str]):
     conn.close()
     print("Database seeding complete.")
 
+def _is_csv_dump(path: str) -> bool:
+    name = path[:-3] if path.endswith(".gz") else path
+    return name.endswith((".csv", ".tsv"))
+
+def iter_dump_records(path: str):
+    """
+    Stream raw records from an OpenFoodFacts dump on local disk without
+    loading it: JSONL lines (parsed later, in the worker processes) or CSV
+    rows as dicts. The official CSV export is tab-separated; both files may
+    be gzipped.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if not _is_csv_dump(path):
+            for line in f:
+                if line.strip():
+                    yield line
+            return
+
+        csv.field_size_limit(2**31 - 1)
+        header = f.readline()
+        delimiter = "\t" if "\t" in header else ","
+        fields = next(csv.reader([header], delimiter=delimiter))
+        for row in csv.DictReader(f, fieldnames=fields, delimiter=delimiter):
+            yield row
+
+def _product_from_csv_row(row: dict) -> dict:
+    return {
+        "product_name": row.get("product_name") or "",
+        "code": row.get("code") or "N/A",
+        "url": row.get("url") or "",
+        "nutriments": {key: row[key] for key in CANONICAL_NUTRIENTS if row.get(key) not in (None, "")},
+    }
+
+def _normalize_chunk(task: tuple[bool, list]) -> list[tuple]:
+    """
+    Worker: parse and normalize one chunk of dump records into foods rows.
+    Products without a name or without all canonical nutrients are dropped.
+    """
+    is_csv, records = task
+    rows = []
+    for record in records:
+        if is_csv:
+            product = _product_from_csv_row(record)
+        else:
+            try:
+                product = json.loads(record)
+            except json.JSONDecodeError:
+                continue
+        if not (product.get("product_name") or "").strip():
+            continue
+        normalized = normalize_data(product)
+        if normalized:
+            rows.append((
+                normalized["name"], normalized["barcode"], normalized["url"], normalized["calories_100g"],
+                normalized["protein_100g"], normalized["carbs_100g"], normalized["fat_100g"],
+            ))
+    return rows
+
+# Products without a code are matched on name instead of barcode
+MISSING_BARCODES = ("", "N/A")
+# Keys per IN (...) lookup, under SQLite's host parameter limit
+_LOOKUP_CHUNK = 900
+
+def _foods_columns(conn: sqlite3.Connection):
+    """
+    Columns and row shaper for whichever foods schema the database has: this
+    script's (FOODS_TABLE_SQL) or the app's models.Food, which has no URL
+    column and names the per-100g nutrients differently.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(foods)")}
+    if "calories_100g" in columns:
+        return ("name", "barcode", "url", "calories_100g", "protein_100g", "carbs_100g", "fat_100g"), lambda row: row
+    return ("name", "barcode", "calories", "protein", "carbs", "fats"), lambda row: (row[0], row[1], *row[3:])
+
+def _food_key(row: tuple) -> tuple:
+    return ("name", row[0]) if row[1] in MISSING_BARCODES else ("barcode", row[1])
+
+def _existing_food_ids(conn: sqlite3.Connection, keys: list[tuple]) -> dict:
+    """ids of foods already stored under each key (the oldest row when there are several)"""
+    existing = {}
+    for kind, sql in (("barcode", "SELECT id, barcode FROM foods WHERE barcode IN ({})"),
+                      ("name", "SELECT id, name FROM foods WHERE barcode IN ('', 'N/A') AND name IN ({})")):
+        values = [value for key_kind, value in keys if key_kind == kind]
+        for i in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[i:i + _LOOKUP_CHUNK]
+            for food_id, value in conn.execute(sql.format(",".join("?" * len(chunk))) + " ORDER BY id DESC", chunk):
+                existing[(kind, value)] = food_id
+    return existing
+
+def _facts_offsets(conn: sqlite3.Connection, dump: str, checkpoint, facts_path: str | None,
+                   resuming: bool) -> tuple:
+    """
+    (start, offset) of this import's lines in the facts JSONL, which imports
+    of other dumps may share. While no other import has committed lines
+    after this one's start, everything past the checkpointed offset belongs
+    to a batch that never committed, and a fresh run of the same dump
+    replaces the lines of the previous run. Otherwise cutting the file back
+    would delete the other imports' lines, so this import appends at the end.
+    """
+    if not facts_path:
+        return None, None
+    size = os.path.getsize(facts_path) if os.path.exists(facts_path) else 0
+    path = os.path.abspath(facts_path)
+    if checkpoint and checkpoint[4] == path and checkpoint[5] is not None and checkpoint[6] <= size:
+        start, offset = checkpoint[5], checkpoint[6]
+        overtaken = conn.execute(
+            "SELECT 1 FROM import_checkpoints WHERE facts_path = ? AND dump != ? AND facts_offset > ? LIMIT 1",
+            (path, dump, start),
+        ).fetchone()
+        if not overtaken:
+            return (start, offset) if resuming else (start, start)
+    return size, size
+
+def _dump_identity(path: str) -> tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, int(stat.st_mtime)
+
+def bulk_import(dump_path: str, db_path: str = "data/app.db", batch_size: int = 50_000, chunk_size: int = 2_000,
+                workers: int | None = None, facts_path: str | None = None, resume: bool = True) -> dict:
+    """
+    Offline bulk import of an OpenFoodFacts dump into the foods table.
+
+    Records are normalized by `normalize_data` in a process pool (chunks of
+    `chunk_size`, a bounded number in flight) and written with executemany
+    in transactions of about `batch_size` records. Progress is checkpointed
+    in the same transaction as the rows it covers, so an interrupted import
+    resumes exactly where it stopped; a changed dump file starts over.
+    Products are upserted on barcode (on name when they have none), so
+    running an import again updates the foods it added before, keeping
+    their ids, instead of duplicating them.
+    `facts_path` also appends each imported product to a nutrition facts
+    JSONL. Its length is checkpointed with the batch, and the file is cut
+    back to the checkpoint on resume (or to where the previous run of the
+    dump started on a fresh run), so it always matches the committed rows.
+    Once an import of another dump has appended to the same file, the dump's
+    lines are left alone and new ones are appended after the other import's.
+    """
+    dump, size, mtime = _dump_identity(dump_path)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-200000")
+    conn.execute(FOODS_TABLE_SQL)
+    # Upserts look products up by barcode
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_foods_barcode ON foods (barcode)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS import_checkpoints (dump TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+        "records_done INTEGER, imported INTEGER, updated_at REAL)"
+    )
+    checkpoint_columns = {row[1] for row in conn.execute("PRAGMA table_info(import_checkpoints)")}
+    for column, column_type in (("facts_path", "TEXT"), ("facts_start", "INTEGER"), ("facts_offset", "INTEGER")):
+        if column not in checkpoint_columns:
+            conn.execute(f"ALTER TABLE import_checkpoints ADD COLUMN {column} {column_type}")
+    conn.commit()
+    columns, shape_row = _foods_columns(conn)
+    insert_sql = f"INSERT INTO foods ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    update_sql = f"UPDATE foods SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?"
+
+    records_done = imported = updated = 0
+    checkpoint = conn.execute(
+        "SELECT size, mtime, records_done, imported, facts_path, facts_start, facts_offset "
+        "FROM import_checkpoints WHERE dump = ?", (dump,)
+    ).fetchone()
+    resuming = bool(resume and checkpoint and checkpoint[:2] == (size, mtime))
+    if resuming:
+        records_done, imported = checkpoint[2], checkpoint[3]
+        print(f"Resuming {dump_path} after {records_done} records ({imported} imported)")
+    facts_start, facts_offset = _facts_offsets(conn, dump, checkpoint, facts_path, resuming)
+
+    is_csv = _is_csv_dump(dump_path)
+    records = itertools.islice(iter_dump_records(dump_path), records_done, None)
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+    facts_file = None
+    if facts_path:
+        facts_file = open(facts_path, "ab")
+        facts_file.truncate(facts_offset)
+        facts_file.seek(0, os.SEEK_END)
+    workers = workers or os.cpu_count() or 1
+    started = time.time()
+    start_done = records_done
+
+    def write_batch(rows: list[tuple], batch_records: int):
+        nonlocal records_done, imported, updated, facts_offset
+        # The last record wins when a product appears more than once
+        batch = {_food_key(row): row for row in rows}
+        if facts_file:
+            # Written ahead of the commit; the checkpointed offset decides whether they count
+            for row in batch.values():
+                meta = dict(zip(("name", "barcode", "url", "calories_100g", "protein_100g", "carbs_100g", "fat_100g"), row))
+                facts_file.write((json.dumps({"fact_text": create_fact_text(meta), "meta": meta}) + "\n").encode())
+            facts_file.flush()
+            facts_offset = facts_file.tell()
+        with conn:  # one transaction: rows + checkpoint
+            existing = _existing_food_ids(conn, list(batch))
+            conn.executemany(update_sql, [(*shape_row(row), existing[key]) for key, row in batch.items() if key in existing])
+            conn.executemany(insert_sql, [shape_row(row) for key, row in batch.items() if key not in existing])
+            records_done += batch_records
+            imported += len(batch)
+            updated += len(existing)
+            conn.execute(
+                "INSERT OR REPLACE INTO import_checkpoints (dump, size, mtime, records_done, imported, updated_at, "
+                "facts_path, facts_start, facts_offset) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dump, size, mtime, records_done, imported, time.time(),
+                 os.path.abspath(facts_path) if facts_path else None, facts_start, facts_offset),
+            )
+        rate = (records_done - start_done) / max(time.time() - started, 1e-9)
+        print(f"  {records_done} records read, {imported} imported ({rate:,.0f} records/s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight: deque[tuple[Future, int]] = deque()
+            batch_rows, batch_records = [], 0
+            for chunk in itertools.chain(chunks, [None]):
+                if chunk is not None:
+                    in_flight.append((executor.submit(_normalize_chunk, (is_csv, chunk)), len(chunk)))
+                # Keep the pool busy without reading the whole dump ahead; results are consumed in order
+                while in_flight and (chunk is None or len(in_flight) > workers * 2):
+                    future, count = in_flight.popleft()
+                    batch_rows.extend(future.result())
+                    batch_records += count
+                    if batch_records >= batch_size:
+                        write_batch(batch_rows, batch_records)
+                        batch_rows, batch_records = [], 0
+            if batch_records:
+                write_batch(batch_rows, batch_records)
+    finally:
+        if facts_file:
+            facts_file.close()
+        conn.close()
+
+    elapsed = time.time() - started
+    print(f"Bulk import complete: {imported} foods ({updated} already present and updated) "
+          f"from {records_done} records in {elapsed:.1f}s")
+    return {"records": records_done, "imported": imported, "updated": updated, "seconds": elapsed}
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch data from Open Food Facts and prepopulate the database.")
     parser.add_argument("--seed", type=str, help='Comma-separated list of food items to seed (e.g., "paneer,apple,banana").')
+    parser.add_argument("--dump", type=str, help="Bulk import a local OpenFoodFacts dump (.jsonl/.csv, optionally .gz) instead.")
+    parser.add_argument("--db", type=str, default="data/app.db", help="SQLite database for --dump (default: data/app.db)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Records per transaction/checkpoint for --dump")
+    parser.add_argument("--workers", type=int, default=None, help="normalize_data worker processes (default: CPU count)")
+    parser.add_argument("--facts-output", type=str, default=None, help="Also append imported products to this facts JSONL")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and import the dump from the start")
     args = parser.parse_args()
 
-    if args.seed:
+    if args.dump:
+        bulk_import(args.dump, db_path=args.db, batch_size=args.batch_size, workers=args.workers,
+                    facts_path=args.facts_output, resume=not args.no_resume)
+    elif args.seed:
         seed_terms = [term.strip() for term in args.seed.split(",")]
         seed_data(seed_terms)
@@ -0,0 +1,103 @@
+import math
+import re
+from collections import defaultdict
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+def normalize_name(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over fact documents.
+
+    Documents are row-aligned with the FAISS index; None marks a tombstoned
+    row. Exact (normalized) product names are indexed separately so callers
+    can short-circuit on an exact-name hit.
+    """
+
+    def __init__(self, documents: list[str | None], names: list[str | None] | None = None,
+                 k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_rows = len(documents)
+
+        postings: defaultdict[str, tuple[list[int], list[int]]] = defaultdict(lambda: ([], []))
+        doc_lengths = np.zeros(self.num_rows, dtype=np.float32)
+        for row, document in enumerate(documents):
+            if not document:
+                continue
+            counts: defaultdict[str, int] = defaultdict(int)
+            for token in tokenize(document):
+                counts[token] += 1
+            doc_lengths[row] = sum(counts.values())
+            for token, count in counts.items():
+                rows, tfs = postings[token]
+                rows.append(row)
+                tfs.append(count)
+
+        live = doc_lengths > 0
+        self.num_docs = int(live.sum())
+        avg_length = float(doc_lengths[live].mean()) if self.num_docs else 1.0
+        # Per-row length normalization term of the BM25 denominator
+        self._norm = k1 * (1 - b + b * doc_lengths / avg_length)
+
+        self._postings = {}
+        for token, (rows, tfs) in postings.items():
+            df = len(rows)
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            self._postings[token] = (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float32), idf)
+
+        self._names = defaultdict(list)
+        for row, name in enumerate(names or []):
+            if name and documents[row]:
+                self._names[normalize_name(name)].append(row)
+
+    def search(self, query: str, k: int, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """
+        Return up to k (row, score) pairs ranked by BM25 score, optionally
+        restricted to rows where the boolean `mask` is set.
+        """
+        scores = None
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            rows, tfs, idf = posting
+            if scores is None:
+                scores = np.zeros(self.num_rows, dtype=np.float32)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[rows])
+
+        if scores is None:
+            return []
+        if mask is not None:
+            scores[~mask] = 0
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(row), float(scores[row])) for row in hits]
+
+    def exact_name_rows(self, query: str) -> list[int]:
+        """Rows whose product name matches the query exactly (case/punctuation-insensitive)."""
+        return list(self._names.get(normalize_name(query), []))
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], weights: list[float], k: int = 60) -> list[tuple[int, float]]:
+    """
+    Fuse several ranked lists of row ids with weighted reciprocal-rank fusion:
+    score(row) = sum(weight / (k + rank)).
+    """
+    fused: defaultdict[int, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        if weight <= 0:
+            continue
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] += weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
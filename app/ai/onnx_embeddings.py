@@ -0,0 +1,74 @@
+import os
+import numpy as np
+
+# Default location of exported models: <ONNX_MODEL_DIR>/<model name>/{model.onnx,tokenizer.json}
+ONNX_MODEL_DIR = os.getenv("EMB_ONNX_DIR", "app/models/onnx")
+
+def onnx_model_dir(model_name: str) -> str:
+    """Directory holding the exported ONNX graph and tokenizer for `model_name`."""
+    return os.path.join(ONNX_MODEL_DIR, model_name.split("/")[-1])
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Attention-masked mean over the token axis, as in the sentence-transformers Pooling layer."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+class OnnxEmbeddingModel:
+    """
+    CPU sentence encoder running an exported (optionally int8-quantized)
+    transformer through onnxruntime, with the same `encode()` interface as
+    SentenceTransformer. Avoids importing torch in the serving process.
+
+    Export a model with scripts/export_onnx_model.py.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool | None = None, max_seq_length: int = 256,
+                 batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if quantized is None:
+            quantized = os.getenv("EMB_ONNX_QUANTIZED", "1") == "1"
+        quantized_path = os.path.join(model_dir, "model_quantized.onnx")
+        model_path = quantized_path if quantized and os.path.exists(quantized_path) else os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No ONNX model at {model_path}. Run scripts/export_onnx_model.py first.")
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("EMB_ONNX_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def encode(self, texts, convert_to_numpy: bool = True, show_progress_bar: bool = False,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + self.batch_size]))
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, {name: feeds[name] for name in self._input_names})[0]
+            batches.append(mean_pool(token_embeddings, attention_mask))
+
+        embeddings = np.vstack(batches).astype(np.float32) if batches else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
@@ -2,8 +2,12 @@
 import json
 import numpy as np
 import os
+import threading
+from typing import Any
 from dotenv import load_dotenv
 import logging
+from app.cache import TTLCache
+from app.ai.lexical import BM25Index, reciprocal_rank_fusion
 
 load_dotenv()
 
@@ -12,76 +16,382 @@ logger = logging.getLogger(__name__)
 FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "app/indexes/nutrition.index")
 EMB_MODEL = os.getenv("EMB_MODEL", "all-MiniLM-L6-v2")
 METADATA_PATH = "app/indexes/metadata.jsonl"
+EMBEDDINGS_PATH = os.getenv("FAISS_EMBEDDINGS_PATH", "app/indexes/embeddings.npy")
+# Memory-map the index and embeddings so all workers on a host share the page cache
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") == "1"
+# Fact texts are read from the row-aligned store written by the index builder
+# (see the manifest); older indexes fall back to the source JSONL.
+FACTS_PATH = os.getenv("NUTRITION_FACTS_PATH")
+LEGACY_FACTS_PATH = "data/nutrition_facts.jsonl"
+
+# Optional overrides for the search-time parameters recorded in the index manifest
+FAISS_NPROBE = os.getenv("FAISS_NPROBE")
+FAISS_EF_SEARCH = os.getenv("FAISS_EF_SEARCH")
+
+# Query caches: most traffic is the same few hundred food names
+RETRIEVER_CACHE_SIZE = int(os.getenv("RETRIEVER_CACHE_SIZE", "2048"))
+RETRIEVER_CACHE_TTL = float(os.getenv("RETRIEVER_CACHE_TTL", "3600"))
+RETRIEVER_RESULT_CACHE_SIZE = int(os.getenv("RETRIEVER_RESULT_CACHE_SIZE", "512"))
+
+_embedding_cache = TTLCache(maxsize=RETRIEVER_CACHE_SIZE, ttl=RETRIEVER_CACHE_TTL)
+_result_cache = TTLCache(maxsize=RETRIEVER_RESULT_CACHE_SIZE, ttl=RETRIEVER_CACHE_TTL)
+
+# Hybrid retrieval: weight of the BM25 ranking in reciprocal-rank fusion
+# (0 = pure vector search, 1 = pure lexical search). Off by default: with
+# fusion the returned score is an RRF value, not a cosine similarity.
+RETRIEVER_LEXICAL_WEIGHT = float(os.getenv("RETRIEVER_LEXICAL_WEIGHT", "0.0"))
+RRF_K = 60
+
+# Nutrient columns that can be range-filtered at retrieval time
+FILTERABLE_FIELDS = ("calories_100g", "protein_100g", "carbs_100g", "fat_100g")
+# Filters matching at most this many rows are scored directly against the
+# embeddings; broader ones restrict the FAISS search with an ID selector
+RETRIEVER_BRUTE_FORCE_MAX = int(os.getenv("RETRIEVER_BRUTE_FORCE_MAX", "10000"))
 
 # Lazy-loaded resources (loaded on first call, not at import time)
 # This saves ~500MB RAM at startup, critical for free-tier hosting
-_index = None
-_model = None
-_metadata = None
+_index: Any = None
+_model: Any = None
+_facts: Any = None
+_metadata: list[dict | None] = []
+_manifest: dict = {}
+_embeddings: np.ndarray | None = None
+# Built on first hybrid query (lexical weight > 0), not at load
+_lexical: BM25Index | None = None
+_lexical_lock = threading.Lock()
+_columns: dict[str, np.ndarray] = {}
+_live: np.ndarray = np.zeros(0, dtype=bool)
+
+def _read_index(path: str):
+    """Read the FAISS index, memory-mapped when FAISS_MMAP is enabled."""
+    import faiss
+
+    if FAISS_MMAP:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.warning(f"Could not memory-map {path}, loading into RAM instead: {e}")
+    return faiss.read_index(path)
 
 def _load_resources():
-    """Lazily load FAISS index, SentenceTransformer model, and metadata."""
-    global _index, _model, _metadata
+    """Lazily load FAISS index, SentenceTransformer model, metadata, embeddings and fact store."""
+    global _index, _model, _metadata, _facts, _manifest, _embeddings, _lexical, _columns, _live
     
     if _index is not None:
         return  # Already loaded
     
     try:
-        import faiss
-        from sentence_transformers import SentenceTransformer
+        from app.ai.fact_store import FactStore
+        from app.ai.embeddings import load_manifest, apply_search_params, get_embedding_model
         
         logger.info("Loading FAISS index and SentenceTransformer model (first call)...")
         
-        _index = faiss.read_index(FAISS_INDEX_PATH)
-        _model = SentenceTransformer(EMB_MODEL)
+        index = _read_index(FAISS_INDEX_PATH)
+        manifest = load_manifest(FAISS_INDEX_PATH)
+        params = manifest.setdefault("params", {})
+        if FAISS_NPROBE:
+            params["nprobe"] = int(FAISS_NPROBE)
+        if FAISS_EF_SEARCH:
+            params["ef_search"] = int(FAISS_EF_SEARCH)
+        apply_search_params(index, manifest)
+        if _model is None:
+            _model = get_embedding_model(EMB_MODEL)
         
-        _metadata = []
+        metadata = []
         with open(METADATA_PATH, "r") as f:
             for line in f:
-                _metadata.append(json.loads(line))
+                metadata.append(json.loads(line))
+        
+        facts_path = FACTS_PATH or manifest.get("facts_path") or LEGACY_FACTS_PATH
+        if _facts is None or _facts.path != facts_path:
+            _facts = FactStore(facts_path)
+        else:
+            _facts.reload()
         
-        logger.info("FAISS resources loaded successfully.")
+        embeddings = None
+        if os.path.exists(EMBEDDINGS_PATH):
+            embeddings = np.load(EMBEDDINGS_PATH, mmap_mode="r" if FAISS_MMAP else None)
+        
+        if embeddings is not None and len(embeddings) != len(metadata):
+            logger.warning(f"{EMBEDDINGS_PATH} has {len(embeddings)} rows for {len(metadata)} metadata rows; "
+                           "filtered searches will use FAISS ID selectors")
+            embeddings = None
+        
+        _metadata = metadata
+        _embeddings = embeddings
+        _lexical = None
+        _columns = _build_nutrient_columns(metadata)
+        _live = _build_live_mask(metadata)
+        _manifest = manifest
+        _index = index
+        
+        logger.info(f"FAISS resources loaded successfully ({manifest.get('index_type', 'flat')} index, {index.ntotal} vectors).")
     except Exception as e:
         logger.error(f"Failed to load FAISS resources: {e}")
         raise
 
-def retrieve_facts(query: str, k: int = 5) -> list[dict]:
+def _build_lexical_index(metadata: list[dict | None], facts):
+    """BM25 index over product name, URL slug (which carries the brand) and fact text."""
+    documents: list[str | None] = []
+    names: list[str | None] = []
+    for row, meta in enumerate(metadata):
+        if meta is None:
+            documents.append(None)
+            names.append(None)
+            continue
+        slug = meta.get("url", "").rstrip("/").rsplit("/", 1)[-1]
+        documents.append(" ".join([meta.get("name", ""), slug, facts.get(row)]))
+        names.append(meta.get("name"))
+    return BM25Index(documents, names)
+
+def _get_lexical() -> BM25Index:
+    """The BM25 index for the loaded metadata, built on first use."""
+    global _lexical
+    with _lexical_lock:
+        if _lexical is None:
+            metadata = _metadata
+            lexical = _build_lexical_index(metadata, _facts)
+            # A reload may have swapped the metadata while this was building
+            if metadata is _metadata:
+                _lexical = lexical
+            return lexical
+        return _lexical
+
+def _build_live_mask(metadata: list[dict | None]) -> np.ndarray:
+    """Rows that are not tombstoned"""
+    return np.array([meta is not None for meta in metadata], dtype=bool)
+
+def _build_nutrient_columns(metadata: list[dict | None]) -> dict[str, np.ndarray]:
+    """Columnar float arrays of the filterable nutrients; NaN for missing values and tombstones."""
+    columns = {}
+    for field in FILTERABLE_FIELDS:
+        values = np.full(len(metadata), np.nan, dtype=np.float32)
+        for row, meta in enumerate(metadata):
+            value = meta.get(field) if meta else None
+            if isinstance(value, (int, float)):
+                values[row] = value
+        columns[field] = values
+    return columns
+
+def _filter_mask(filters: dict) -> np.ndarray:
+    """
+    Boolean row mask for {field: (min, max)} range filters; either bound may be None.
+    Rows with a missing value never match a filter on that field.
+    """
+    mask = _live.copy()
+    for field, (low, high) in filters.items():
+        if field not in FILTERABLE_FIELDS:
+            raise ValueError(f"Cannot filter on '{field}'. Expected one of {', '.join(FILTERABLE_FIELDS)}")
+        column = _columns[field]
+        mask &= ~np.isnan(column)
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+    return mask
+
+def _filtered_vector_search(query_embeddings: np.ndarray, mask: np.ndarray, depth: int):
+    """
+    Top-`depth` search restricted to the rows in `mask`. Up to
+    RETRIEVER_BRUTE_FORCE_MAX candidates are scored exactly against the
+    (memory-mapped) embeddings; larger candidate sets, or a missing
+    embeddings file, restrict the FAISS search itself with a bitmap ID
+    selector instead of copying every candidate row per query.
+    """
+    import faiss
+
+    candidates = np.flatnonzero(mask)
+    depth = min(depth, len(candidates))
+    if depth == 0:
+        empty = np.empty((len(query_embeddings), 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+
+    if _embeddings is not None and len(candidates) <= RETRIEVER_BRUTE_FORCE_MAX:
+        scores = query_embeddings @ np.asarray(_embeddings[candidates]).T
+        top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        return np.take_along_axis(top_scores, order, axis=1), candidates[np.take_along_axis(top, order, axis=1)]
+
+    # The bitmap must stay referenced until the search returns
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    index_type = _manifest.get("index_type", "flat")
+    if index_type in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(_index).nprobe)
+    elif index_type == "hnsw":
+        hnsw_index = faiss.downcast_index(_index.index) if isinstance(_index, faiss.IndexIDMap) else _index
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw_index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return _index.search(query_embeddings, depth, params=params)
+
+def preload_resources():
+    """
+    Load retrieval resources eagerly, e.g. in a pre-fork server master so
+    workers inherit the model weights and mapped index instead of each
+    loading their own copy.
+    """
+    try:
+        _load_resources()
+        logger.info("Retrieval resources preloaded.")
+    except Exception as e:
+        logger.warning(f"Retrieval preload failed, falling back to lazy loading: {e}")
+
+def reload_resources():
+    """
+    Reload the FAISS index, metadata and fact store from disk.
+    The embedding model is kept, so new facts are picked up without a restart.
+    """
+    global _index
+    _index = None
+    _load_resources()
+    clear_caches()
+
+def clear_caches():
+    """Drop cached query embeddings and results (e.g. after an index rebuild)."""
+    _embedding_cache.clear()
+    _result_cache.clear()
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the query embedding and result caches."""
+    return {
+        "embeddings": _embedding_cache.stats(),
+        "results": _result_cache.stats(),
+    }
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _encode_queries(queries: list[str]) -> np.ndarray:
+    """
+    Return normalized embeddings for `queries`, encoding only the ones
+    missing from the embedding cache (in a single forward pass).
+    """
+    import faiss
+
+    vectors = [_embedding_cache.get(query) for query in queries]
+    missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+
+    if missing:
+        encoded = _model.encode(missing, convert_to_numpy=True)
+        encoded = np.ascontiguousarray(encoded, dtype=np.float32)
+        faiss.normalize_L2(encoded)
+        fresh = dict(zip(missing, encoded))
+        for query, vector in fresh.items():
+            _embedding_cache.set(query, vector)
+        vectors = [fresh[q] if v is None else v for q, v in zip(queries, vectors)]
+
+    return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+
+def _result(row: int, score: float) -> dict:
+    return {
+        "score": float(score),
+        "fact": _facts.get(row),
+        "meta": _metadata[row]
+    }
+
+def _vector_hits(distances, indices) -> list[tuple[int, float]]:
+    """Row ids and scores from one row of FAISS output, skipping missing and tombstoned rows."""
+    return [
+        (int(row), float(score))
+        for score, row in zip(distances, indices)
+        if 0 <= row < len(_metadata) and _metadata[row] is not None
+    ]
+
+def _lexical_fast_path(query: str, lexical_hits: list[tuple[int, float]], k: int,
+                       mask: np.ndarray | None = None) -> list[dict] | None:
+    """
+    Results for an exact product-name hit with enough lexical matches to fill k,
+    which lets the query skip the embedding model entirely.
+    """
+    exact_rows = [row for row in _get_lexical().exact_name_rows(query) if mask is None or mask[row]]
+    if not exact_rows or len(lexical_hits) < k:
+        return None
+    ranked = exact_rows + [row for row, _ in lexical_hits if row not in exact_rows]
+    scores = dict(lexical_hits)
+    return [_result(row, scores.get(row, 0.0)) for row in ranked[:k]]
+
+def retrieve_facts(query: str, k: int = 5, lexical_weight: float | None = None,
+                   filters: dict | None = None) -> list[dict]:
     """
     Retrieves the top k most relevant facts for a given query.
     Resources are lazy-loaded on first call.
+
+    `lexical_weight` blends BM25 with vector similarity via reciprocal-rank
+    fusion (0 = vector only, 1 = lexical only); defaults to RETRIEVER_LEXICAL_WEIGHT.
+    Scores are cosine similarities for vector-only search, and BM25 or fused
+    RRF values (comparable only within one response) once lexical_weight > 0.
+
+    `filters` restricts results to nutrient ranges, e.g.
+    {"calories_100g": (None, 200), "protein_100g": (10, None)}; the filtered
+    top k is exact for flat indexes and for filters matching up to
+    RETRIEVER_BRUTE_FORCE_MAX rows.
     """
-    import faiss
-    
+    return retrieve_facts_batch([query], k=k, lexical_weight=lexical_weight, filters=filters)[0]
+
+def retrieve_facts_batch(queries: list[str], k: int = 5, lexical_weight: float | None = None,
+                         filters: dict | None = None) -> list[list[dict]]:
+    """
+    Retrieves the top k facts for each query in one pass.
+    All queries that need vector search are encoded together and searched
+    with a single FAISS call, so the result list is aligned with `queries`.
+    """
+    if not queries:
+        return []
+
     _load_resources()
-    
-    # Encode the query into an embedding
-    query_embedding = _model.encode([query], convert_to_numpy=True)
-
-    # Normalize the query embedding
-    faiss.normalize_L2(query_embedding)
-
-    # Search the FAISS index
-    distances, indices = _index.search(query_embedding, k)
-
-    # Prepare the results
-    results = []
-    for i in range(k):
-        if i < len(indices[0]):
-            index_val = indices[0][i]
-            if index_val < len(_metadata):
-                # Retrieve fact_text from jsonl file
-                fact_text = ""
-                with open("data/nutrition_facts.jsonl", "r") as f:
-                    for j, line in enumerate(f):
-                        if j == index_val:
-                            data = json.loads(line)
-                            fact_text = data.get("fact_text", "")
-                            break
-
-                results.append({
-                    "score": float(distances[0][i]),
-                    "fact": fact_text,
-                    "meta": _metadata[index_val]
-                })
+
+    weight = RETRIEVER_LEXICAL_WEIGHT if lexical_weight is None else min(max(lexical_weight, 0.0), 1.0)
+    mask = _filter_mask(filters) if filters else None
+    filter_key = tuple(sorted((field, tuple(bounds)) for field, bounds in filters.items())) if filters else None
+    normalized = [_normalize_query(query) for query in queries]
+    results = [_result_cache.get((query, k, weight, filter_key)) for query in normalized]
+    pending = list(dict.fromkeys(q for q, result in zip(normalized, results) if result is None))
+
+    if pending:
+        fresh = {}
+        lexical = {}
+        depth = max(k * 4, 20) if weight > 0 else k
+
+        for query in pending:
+            if weight <= 0:
+                continue
+            lexical[query] = _get_lexical().search(query, depth, mask=mask)
+            if weight >= 1:
+                fresh[query] = [_result(row, score) for row, score in lexical[query][:k]]
+            else:
+                fast = _lexical_fast_path(query, lexical[query], k, mask=mask)
+                if fast is not None:
+                    fresh[query] = fast
+
+        vector_queries = [query for query in pending if query not in fresh]
+        if vector_queries:
+            # Encode uncached queries in one forward pass (normalized, cached)
+            query_embeddings = _encode_queries(vector_queries)
+
+            # Search the FAISS index over the stacked query matrix; over-fetch
+            # when the index still holds tombstoned rows it could not remove
+            if mask is not None:
+                distances, indices = _filtered_vector_search(query_embeddings, mask, depth)
+            else:
+                search_k = depth + _manifest.get("tombstones_in_index", 0)
+                distances, indices = _index.search(query_embeddings, search_k)
+
+            for row, query in enumerate(vector_queries):
+                vector_hits = _vector_hits(distances[row], indices[row])
+                if weight <= 0:
+                    fresh[query] = [_result(r, score) for r, score in vector_hits[:k]]
+                    continue
+                fused = reciprocal_rank_fusion(
+                    [[r for r, _ in vector_hits], [r for r, _ in lexical[query]]],
+                    [1.0 - weight, weight],
+                    k=RRF_K,
+                )
+                fresh[query] = [_result(r, score) for r, score in fused[:k]]
+
+        for query in pending:
+            _result_cache.set((query, k, weight, filter_key), fresh[query])
+        results = [fresh[q] if r is None else r for q, r in zip(normalized, results)]
 
     return results
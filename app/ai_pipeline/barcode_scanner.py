@@ -7,10 +7,10 @@ import cv2
 import numpy as np
 from pyzbar.pyzbar import decode
 from PIL import Image
-import requests
 import json
 from typing import Dict, Optional, Tuple
 import re
+from app.services.upstream_health import upstream_health
 
 class BarcodeScanner:
     """
@@ -152,7 +152,8 @@ class BarcodeScanner:
         # Try OpenFoodFacts first (most comprehensive)
         try:
             url = f"{self.databases['openfoodfacts']}{barcode}.json"
-            response = requests.get(url, timeout=5)
+            # Skipped at once while OpenFoodFacts is failing; timeout follows its recent latency (max 5s)
+            response = upstream_health.get(url, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -192,7 +193,7 @@ class BarcodeScanner:
             # Note: UPC Database requires API key, this is just structure
             url = f"{self.databases['upc_database']}{barcode}"
             # Add your API key here if you have one
-            response = requests.get(url, timeout=5)
+            response = upstream_health.get(url, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
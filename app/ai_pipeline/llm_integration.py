@@ -3,11 +3,9 @@ import json
 import os
 import logging
 from sqlalchemy.orm import Session
-from app.crud import get_user_profile, get_user_goals, get_logs_by_user
+from app.crud import get_user_profile, get_user_goals, get_logs_by_user, get_daily_totals_by_user
 from app.ai.retriever import retrieve_facts
 from datetime import date
-from sqlalchemy import func
-from app import models
 
 logger = logging.getLogger(__name__)
 
@@ -253,30 +251,3 @@ def fallback_explanation(classification):
         return "This food seems like a good choice for you based on your profile and goals. It aligns well with your nutritional needs."
     else:
         return "This food might not be the best choice for you right now. It may not align with your current nutritional goals. Consider looking for alternatives."
-
-def get_daily_totals_by_user(db: Session, user_id: int, date: str):
-    """Get daily nutrition totals for a specific user and date."""
-    totals = (
-        db.query(
-            func.sum(models.Food.calories * models.DailyLog.quantity).label("calories"),
-            func.sum(models.Food.protein * models.DailyLog.quantity).label("protein"),
-            func.sum(models.Food.carbs * models.DailyLog.quantity).label("carbs"),
-            func.sum(models.Food.fats * models.DailyLog.quantity).label("fats"),
-        )
-        .join(models.Food, models.DailyLog.food_id == models.Food.id)
-        .filter(
-            models.DailyLog.user_id == user_id,
-            models.DailyLog.date == date
-        )
-        .first()
-    )
-
-    if totals and any(totals):
-        return {
-            "calories": float(totals[0] or 0),
-            "protein": float(totals[1] or 0),
-            "carbs": float(totals[2] or 0),
-            "fats": float(totals[3] or 0),
-        }
-    
-    return {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
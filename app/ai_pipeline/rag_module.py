@@ -1,50 +1,33 @@
-
-import json
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
+from app.ai import retriever
+from app.ai.embeddings import build_faiss_index
 
 class RAGModule:
-    def __init__(self, data_path='data/nutrition_facts.jsonl', index_path='app/indexes/nutrition.index'):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.data_path = data_path
-        self.index_path = index_path
-        self.documents = []
-        self.index = None
-        self._load_documents()
-        self._build_index()
-
-    def _load_documents(self):
-        with open(self.data_path, 'r') as f:
-            for line in f:
-                self.documents.append(json.loads(line))
+    """
+    Pipeline-facing wrapper around the shared retrieval engine in app.ai.retriever.
 
-    def _build_index(self):
-        try:
-            self.index = faiss.read_index(self.index_path)
-        except RuntimeError:
-            embeddings = self.model.encode([doc['fact_text'] for doc in self.documents], convert_to_tensor=True)
-            embeddings = embeddings.cpu().numpy()
-            self.index = faiss.IndexFlatL2(embeddings.shape[1])
-            self.index.add(embeddings)
-            faiss.write_index(self.index, self.index_path)
+    The index, embedding model and fact store are loaded lazily on the first
+    retrieve() and shared with /ai/get-nutrition-facts/, so the pipeline no
+    longer pays for a second model and a second (L2) index. The retriever is
+    process-wide, so the module always builds and serves the retriever's own
+    index files (FAISS_INDEX_PATH and friends).
+    """
 
-    def retrieve(self, query: str, k: int = 3):
-        query_embedding = self.model.encode([query], convert_to_tensor=True)
-        query_embedding = query_embedding.cpu().numpy()
-        distances, indices = self.index.search(query_embedding, k)
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            doc = self.documents[idx]
-            results.append({
-                "score": float(distances[0][i]),
-                "fact": doc['fact_text'],
-                "meta": doc['meta']
-            })
-        return results
+    def __init__(self, data_path='data/nutrition_facts.jsonl'):
+        self.data_path = data_path
 
-rag_module = RAGModule()
+    def build_index(self, **kwargs):
+        """Build the shared FAISS index from `data_path` and reload the retriever."""
+        manifest = build_faiss_index(
+            jsonl_path=self.data_path,
+            model_name=retriever.EMB_MODEL,
+            index_path=retriever.FAISS_INDEX_PATH,
+            embeddings_path=retriever.EMBEDDINGS_PATH,
+            metadata_path=retriever.METADATA_PATH,
+            **kwargs,
+        )
+        if retriever._index is not None:
+            retriever.reload_resources()
+        return manifest
 
-def retrieve_facts(query: str, k: int = 3):
-    return rag_module.retrieve(query=query, k=k)
+    def retrieve(self, query: str, k: int = 3):
+        return retriever.retrieve_facts(query, k=k)
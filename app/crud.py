@@ -1,9 +1,9 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Query, Session, joinedload
+from sqlalchemy import Row, Select, func, select, insert, or_, and_
 from . import models, schemas, auth
 from .utils import calculate_targets
 from datetime import date
-from typing import Optional
+from typing import Optional, List
 
 # ---------- User Profiles ----------
 def get_user_by_email(db: Session, email: str):
@@ -43,8 +43,12 @@ def get_user_profile(db: Session, user_id: int):
         raise ValueError(f"User profile {user_id} not found")
     return profile
 
-def get_user_profiles(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.UserProfile).offset(skip).limit(limit).all()
+def get_user_profiles(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[models.UserProfile]:
+    """Profiles by id; pass the previous page's last id as `after_id` (keyset) instead of `skip` on large tables."""
+    query = db.query(models.UserProfile).order_by(models.UserProfile.id)
+    if after_id is not None:
+        return query.filter(models.UserProfile.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def update_user_profile(db: Session, user_id: int, profile: schemas.UserProfileCreate):
     db_profile = get_user_profile(db, user_id)
@@ -76,8 +80,16 @@ def create_food(db: Session, food: schemas.FoodCreate):
     
     return db_food
 
-def get_foods(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Food).offset(skip).limit(limit).all()
+def get_foods(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[models.Food]:
+    """Foods by id; pass the previous page's last id as `after_id` (keyset) instead of `skip` on large tables."""
+    query = db.query(models.Food).order_by(models.Food.id)
+    if after_id is not None:
+        return query.filter(models.Food.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def iter_foods(db: Session, batch_size: int = 1000) -> Query[models.Food]:
+    """Stream every food by id, `batch_size` rows in memory at a time."""
+    return db.query(models.Food).order_by(models.Food.id).yield_per(batch_size)
 
 def get_food(db: Session, food_id: int):
     return db.query(models.Food).filter(models.Food.id == food_id).first()
@@ -104,6 +116,7 @@ def create_daily_log(db: Session, log: schemas.DailyLogCreate, user_id: int):
     
     if existing_log:
         existing_log.quantity += log.quantity
+        _refresh_daily_total(db, user_id, log_date)
         db.commit()
         db.refresh(existing_log)
         return existing_log
@@ -115,22 +128,103 @@ def create_daily_log(db: Session, log: schemas.DailyLogCreate, user_id: int):
         food_id=log.food_id
     )
     db.add(db_log)
+    _refresh_daily_total(db, user_id, log_date)
     db.commit()
     db.refresh(db_log)
     return db_log
 
+def create_daily_logs_bulk(db: Session, logs: List[schemas.DailyLogCreate], user_id: int):
+    """
+    Log many foods in one transaction (e.g. a whole meal). Same rules as
+    create_daily_log, applied to the batch as a whole: an unknown food or a
+    bad date rejects everything, entries for the same food and day are
+    merged, and foods already logged that day get their quantity increased.
+    Returns the affected logs.
+    """
+    quantities: dict[tuple[int, date], float] = {}
+    for log in logs:
+        try:
+            log_date = date.fromisoformat(log.date)
+        except ValueError:
+            raise ValueError(f"Invalid date format: {log.date}. Expected yyyy-MM-dd")
+        key = (log.food_id, log_date)
+        quantities[key] = quantities.get(key, 0) + log.quantity
+    if not quantities:
+        return []
+    requested = set(quantities)
+    food_ids = {food_id for food_id, _ in requested}
+    dates = {log_date for _, log_date in requested}
+
+    found: set[int] = set(db.scalars(select(models.Food.id).where(models.Food.id.in_(food_ids))))
+    missing = sorted(food_ids - found)
+    if missing:
+        raise ValueError(f"Food IDs not found: {', '.join(map(str, missing))}")
+
+    def affected_logs():
+        return db.query(models.DailyLog).filter(
+            models.DailyLog.user_id == user_id,
+            models.DailyLog.food_id.in_(food_ids),
+            models.DailyLog.date.in_(dates),
+        )
+
+    for existing_log in affected_logs():
+        quantity = quantities.pop((existing_log.food_id, existing_log.date), None)
+        if quantity is not None:
+            existing_log.quantity += quantity
+    if quantities:
+        db.execute(insert(models.DailyLog), [
+            {"user_id": user_id, "food_id": food_id, "date": log_date, "quantity": quantity}
+            for (food_id, log_date), quantity in quantities.items()
+        ])
+    for log_date in dates:
+        _refresh_daily_total(db, user_id, log_date)
+    db.commit()
+
+    logs = affected_logs().options(joinedload(models.DailyLog.food)).order_by(models.DailyLog.id).all()
+    return [log for log in logs if (log.food_id, log.date) in requested]
+
 def get_logs_by_date(db: Session, date: str):
     return db.query(models.DailyLog).filter(models.DailyLog.date == date).options(joinedload(models.DailyLog.food)).all()
 
 def get_all_logs(db: Session):
     return db.query(models.DailyLog).options(joinedload(models.DailyLog.food)).all()
 
-def get_logs_by_user(db: Session, user_id: int, limit: int = 5):
-    """Retrieve the most recent DailyLog entries for a user."""
+def iter_logs(db: Session, user_id: Optional[int] = None, batch_size: int = 1000) -> Query[models.DailyLog]:
+    """Stream logs (one user's, or everyone's) oldest first with their food, `batch_size` rows in memory at a time."""
+    query = db.query(models.DailyLog)
+    if user_id is not None:
+        query = query.filter(models.DailyLog.user_id == user_id)
     return (
-        db.query(models.DailyLog)
-        .filter(models.DailyLog.user_id == user_id)
-        .order_by(models.DailyLog.date.desc())
+        query.order_by(models.DailyLog.date, models.DailyLog.id)
+        .options(joinedload(models.DailyLog.food))
+        .yield_per(batch_size)
+    )
+
+def log_cursor(log: models.DailyLog) -> str:
+    """Keyset cursor for the log listing: the last log's date and id"""
+    return f"{log.date.isoformat()}_{log.id}"
+
+def parse_log_cursor(cursor: str):
+    try:
+        log_date, log_id = cursor.split("_")
+        return date.fromisoformat(log_date), int(log_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def get_logs_by_user(db: Session, user_id: int, limit: int = 5, before: Optional[str] = None) -> List[models.DailyLog]:
+    """
+    Retrieve the most recent DailyLog entries for a user. Pass the previous
+    page's log_cursor() as `before` for the next (older) page.
+    """
+    query = db.query(models.DailyLog).filter(models.DailyLog.user_id == user_id)
+    if before is not None:
+        before_date, before_id = parse_log_cursor(before)
+        query = query.filter(or_(
+            models.DailyLog.date < before_date,
+            and_(models.DailyLog.date == before_date, models.DailyLog.id < before_id),
+        ))
+    return (
+        query.order_by(models.DailyLog.date.desc(), models.DailyLog.id.desc())
         .limit(limit)
         .options(joinedload(models.DailyLog.food))
         .all()
@@ -175,6 +269,7 @@ def delete_daily_log(db: Session, log_id: int):
     if not db_log:
         raise ValueError(f"Log with ID {log_id} not found")
     db.delete(db_log)
+    _refresh_daily_total(db, db_log.user_id, db_log.date)
     db.commit()
     return {"ok": True}
 
@@ -182,6 +277,7 @@ def update_daily_log(db: Session, log_id: int, log_update: schemas.DailyLogUpdat
     db_log = db.query(models.DailyLog).filter(models.DailyLog.id == log_id).first()
     if not db_log:
         raise ValueError(f"Log with ID {log_id} not found")
+    old_date = db_log.date
 
     # Update fields if provided
     if log_update.quantity is not None:
@@ -199,6 +295,9 @@ def update_daily_log(db: Session, log_id: int, log_update: schemas.DailyLogUpdat
         except ValueError:
             raise ValueError(f"Invalid date format: {log_update.date}. Expected yyyy-MM-dd")
 
+    _refresh_daily_total(db, db_log.user_id, db_log.date)
+    if db_log.date != old_date:
+        _refresh_daily_total(db, db_log.user_id, old_date)
     db.commit()
     db.refresh(db_log)
     return db_log
@@ -238,32 +337,99 @@ def get_user_goals(db: Session, user_id: int):
         return []
     return db_goals
 
-def get_daily_totals_by_user(db: Session, user_id: int, date: str):
-    """Get daily nutrition totals for a specific user and date."""
-    
-    # Use select_from to avoid join ambiguity
-    totals = (
-        db.query(
-            func.sum(models.Food.calories * models.DailyLog.quantity).label("calories"),
-            func.sum(models.Food.protein * models.DailyLog.quantity).label("protein"),
-            func.sum(models.Food.carbs * models.DailyLog.quantity).label("carbs"),
-            func.sum(models.Food.fats * models.DailyLog.quantity).label("fats"),
+def get_daily_totals_by_user(db: Session, user_id: int, log_date: date | str) -> dict:
+    """Get daily nutrition totals for a specific user and date (yyyy-MM-dd or date) from the daily_totals rollup."""
+    if isinstance(log_date, str):
+        log_date = date.fromisoformat(log_date)
+    total = db.get(models.DailyTotal, (user_id, log_date))
+    if total is None:
+        return {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
+    return {
+        "calories": total.calories,
+        "protein": total.protein,
+        "carbs": total.carbs,
+        "fats": total.fats,
+    }
+
+def get_daily_totals_range(db: Session, user_id: int, start: date, end: date) -> List[Row]:
+    """(date, calories, protein, carbs, fats) rollup rows for the user's logged days in [start, end], one range scan."""
+    return (
+        db.query(models.DailyTotal.date, models.DailyTotal.calories, models.DailyTotal.protein,
+                 models.DailyTotal.carbs, models.DailyTotal.fats)
+        .filter(models.DailyTotal.user_id == user_id, models.DailyTotal.date.between(start, end))
+        .order_by(models.DailyTotal.date)
+        .all()
+    )
+
+def get_goal_targets(db: Session, user_id: int) -> Optional[dict]:
+    """Daily targets from the user's latest goal, else their profile targets; None if neither is set."""
+    goal = (
+        db.query(models.UserGoal)
+        .filter(models.UserGoal.user_id == user_id)
+        .order_by(models.UserGoal.id.desc())
+        .first()
+    )
+    if goal:
+        return {"calories": goal.calories_goal, "protein": goal.protein_goal,
+                "carbs": goal.carbs_goal, "fats": goal.fats_goal}
+    profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
+    if profile and profile.target_calories:
+        return {"calories": profile.target_calories, "protein": profile.target_protein,
+                "carbs": profile.target_carbs, "fats": profile.target_fats}
+    return None
+
+# ---------- Daily Totals rollup ----------
+def _daily_totals_select() -> Select:
+    """Sums of food values x quantity per (user_id, date) over daily_logs"""
+    return (
+        select(
+            models.DailyLog.user_id,
+            models.DailyLog.date,
+            func.coalesce(func.sum(models.Food.calories * models.DailyLog.quantity), 0),
+            func.coalesce(func.sum(models.Food.protein * models.DailyLog.quantity), 0),
+            func.coalesce(func.sum(models.Food.carbs * models.DailyLog.quantity), 0),
+            func.coalesce(func.sum(models.Food.fats * models.DailyLog.quantity), 0),
         )
         .select_from(models.DailyLog)
         .join(models.Food, models.DailyLog.food_id == models.Food.id)
-        .filter(
-            models.DailyLog.user_id == user_id,
-            models.DailyLog.date == date
-        )
-        .first()
+        .where(models.DailyLog.user_id.isnot(None), models.DailyLog.date.isnot(None))
+        .group_by(models.DailyLog.user_id, models.DailyLog.date)
     )
 
-    if totals and any(totals):
-        return {
-            "calories": float(totals[0] or 0),
-            "protein": float(totals[1] or 0),
-            "carbs": float(totals[2] or 0),
-            "fats": float(totals[3] or 0),
-        }
-    
-    return {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
+def _refresh_daily_total(db: Session, user_id: Optional[int], log_date: Optional[date]) -> None:
+    """Recompute one user's rollup row for a day from daily_logs, inside the caller's transaction."""
+    if user_id is None or log_date is None:
+        return
+    db.flush()
+    row = db.execute(
+        _daily_totals_select().where(models.DailyLog.user_id == user_id, models.DailyLog.date == log_date)
+    ).first()
+    total = db.get(models.DailyTotal, (user_id, log_date))
+    if row is None:
+        if total is not None:
+            db.delete(total)
+        return
+    if total is None:
+        total = models.DailyTotal(user_id=user_id, date=log_date)
+        db.add(total)
+    total.calories, total.protein, total.carbs, total.fats = (float(value) for value in row[2:])
+
+def rebuild_daily_totals(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the daily_totals rollup from daily_logs (all users, or one). Returns the number of rows written."""
+    totals = db.query(models.DailyTotal)
+    source = _daily_totals_select()
+    if user_id is not None:
+        totals = totals.filter(models.DailyTotal.user_id == user_id)
+        source = source.where(models.DailyLog.user_id == user_id)
+    totals.delete(synchronize_session=False)
+    db.execute(insert(models.DailyTotal).from_select(
+        ["user_id", "date", "calories", "protein", "carbs", "fats"], source
+    ))
+    db.commit()
+    return totals.count()
+
+def ensure_daily_totals(db: Session) -> int:
+    """Build the rollup if daily_logs has rows but daily_totals has none, e.g. a database that predates it."""
+    if db.query(models.DailyTotal.user_id).first() is None and db.query(models.DailyLog.id).first() is not None:
+        return rebuild_daily_totals(db)
+    return 0
@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -9,20 +10,36 @@ print("sys.executable on startup:", sys.executable)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("uvicorn.access")
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from . import crud, schemas, models, auth
-from .database import get_db, engine, Base
+from .database import get_db, engine, Base, SessionLocal
 from app.routers import auth as auth_router
 from app.ai.ai_routes import router as ai_router
-from app.services.food_search import search_food_by_name
+from app.services.food_search import search_food_by_name_async, search_foods_batch, get_search_cache_stats
+from app.services.openfoodfacts_client import off_client
+from app.services.fuzzy_names import add_food_names
+from app.services.nutrition_trends import summarize_totals, GRANULARITIES
 from app import health_crud
 from app.health_checker import health_checker
 from typing import List, Optional
+from datetime import date, timedelta
 
 Base.metadata.create_all(bind=engine)
 
+MAX_SEARCH_BATCH = 50
+MAX_TOTALS_RANGE_DAYS = 731
+MAX_BULK_LOGS = 200
+EXPORT_BATCH_SIZE = 1000
+
+# Load the FAISS index and embedding model at import time when requested, so a
+# pre-forking server (see gunicorn.conf.py) shares them across its workers.
+if os.getenv("RETRIEVER_PRELOAD", "0") == "1":
+    from app.ai.retriever import preload_resources
+    preload_resources()
+
 app = FastAPI(title="Nutrition API")
 
 app.add_middleware(
@@ -31,8 +48,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+def load_food_names():
+    # Foods table names join the typo-tolerant name index used by food search
+    db = SessionLocal()
+    try:
+        add_food_names(name for (name,) in db.query(models.Food.name))
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def build_daily_totals():
+    # A database whose daily_totals table was just created by create_all gets its rollup filled once
+    db = SessionLocal()
+    try:
+        rows = crud.ensure_daily_totals(db)
+        if rows:
+            logger.info(f"Backfilled {rows} daily_totals rows")
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await off_client.aclose()
+
 # Routers
 app.include_router(auth_router.router)
 app.include_router(ai_router)
@@ -56,22 +98,77 @@ app.include_router(user_profiles.router)
 
 @app.post("/foods/", response_model=schemas.Food)
 def create_food(food: schemas.FoodCreate, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
-    return crud.create_food(db=db, food=food)
+    db_food = crud.create_food(db=db, food=food)
+    add_food_names([db_food.name])
+    return db_food
 
 @app.get("/foods/", response_model=List[schemas.Food])
-def read_foods(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
-    return crud.get_foods(db=db, skip=skip, limit=limit)
+def read_foods(response: Response, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Foods by id. On large tables page with after_id=<X-Next-Cursor of the previous page> instead of skip"""
+    foods = crud.get_foods(db=db, skip=skip, limit=limit, after_id=after_id)
+    if foods and len(foods) == limit:
+        response.headers["X-Next-Cursor"] = str(foods[-1].id)
+    return foods
+
+def _ndjson_export(rows, schema):
+    """
+    NDJSON lines for every row `rows(db)` yields, written in chunks. Uses its
+    own session: the request's get_db session may be closed before the body
+    is streamed.
+    """
+    db = SessionLocal()
+    try:
+        chunk = []
+        for row in rows(db):
+            chunk.append(schema.model_validate(row, from_attributes=True).model_dump_json())
+            if len(chunk) == EXPORT_BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+    finally:
+        db.close()
+
+@app.get("/foods/export")
+def export_foods(current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Every food as NDJSON, streamed with constant server memory"""
+    rows = lambda db: crud.iter_foods(db, batch_size=EXPORT_BATCH_SIZE)
+    return StreamingResponse(_ndjson_export(rows, schemas.Food), media_type="application/x-ndjson")
 
 # Daily Logs
 @app.post("/logs/", response_model=schemas.DailyLog)
 def create_log(log: schemas.DailyLogCreate, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
     return crud.create_daily_log(db=db, log=log, user_id=current_user.id)
 
+@app.post("/logs/bulk", response_model=List[schemas.DailyLog])
+def create_logs_bulk(request: schemas.DailyLogBulkCreate, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Log a whole meal in one request and one transaction; entries for the same food and day are merged"""
+    if len(request.logs) > MAX_BULK_LOGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_LOGS} logs per request")
+    try:
+        return crud.create_daily_logs_bulk(db=db, logs=request.logs, user_id=current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/logs/", response_model=List[schemas.DailyLog])
-def read_logs(log_date: Optional[str] = None, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+def read_logs(response: Response, log_date: Optional[str] = None, limit: int = 5, cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """A day's logs, or the most recent ones; older pages with cursor=<X-Next-Cursor of the previous page>"""
     if log_date:
         return crud.get_logs_by_date_and_user(db=db, user_id=current_user.id, date=log_date)
-    return crud.get_logs_by_user(db=db, user_id=current_user.id)
+    try:
+        logs = crud.get_logs_by_user(db=db, user_id=current_user.id, limit=limit, before=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if logs and len(logs) == limit:
+        response.headers["X-Next-Cursor"] = crud.log_cursor(logs[-1])
+    return logs
+
+@app.get("/logs/export")
+def export_logs(current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """All of the user's logs, oldest first, as NDJSON streamed with constant server memory"""
+    user_id = current_user.id
+    rows = lambda db: crud.iter_logs(db, user_id=user_id, batch_size=EXPORT_BATCH_SIZE)
+    return StreamingResponse(_ndjson_export(rows, schemas.DailyLog), media_type="application/x-ndjson")
 
 @app.put("/logs/{log_id}", response_model=schemas.DailyLog)
 def update_log(log_id: int, log_update: schemas.DailyLogUpdate, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
@@ -84,9 +181,27 @@ def delete_log(log_id: int, db: Session = Depends(get_db), current_user: models.
     return crud.delete_daily_log(db, log_id=log_id)
 
 # Totals
+# Declared before /totals/{log_date} so "range" is not taken for a date
+@app.get("/totals/range", response_model=schemas.TotalsRange)
+def get_totals_range(start: date, end: date, granularity: str = Query("day", enum=list(GRANULARITIES)),
+                     window: int = Query(7, ge=1, le=90), db: Session = Depends(get_db),
+                     current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Calorie and macro trends by day, week or month with rolling averages and goal adherence, from one rollup query"""
+    if (end - start).days + 1 > MAX_TOTALS_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TOTALS_RANGE_DAYS} days per range")
+    rows = crud.get_daily_totals_range(db, current_user.id, start - timedelta(days=window - 1), end)
+    goals = crud.get_goal_targets(db, current_user.id)
+    try:
+        return summarize_totals(rows, start, end, granularity=granularity, goals=goals, window=window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/totals/{log_date}", response_model=schemas.DailyTotals)
 def get_daily_totals(log_date: str, db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
-    totals = crud.get_daily_totals_by_user(db, current_user.id, log_date)
+    try:
+        totals = crud.get_daily_totals_by_user(db, current_user.id, log_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {log_date}. Expected yyyy-MM-dd")
     return schemas.DailyTotals(date=log_date, **totals)
 
 # Goals
@@ -104,14 +219,35 @@ def update_goal_endpoint(goal_id: int, goal: schemas.UserGoalUpdate, db: Session
 
 # Food Search
 @app.get("/search-food/{food_name}")
-def search_food(food_name: str, current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+async def search_food(food_name: str, current_user: models.UserProfile = Depends(auth.get_current_active_user)):
     """Search for food using OpenFoodFacts API and local database"""
     try:
-        result = search_food_by_name(food_name)
+        result = await search_food_by_name_async(food_name)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Food search failed: {str(e)}")
 
+@app.post("/search-food/batch")
+async def search_food_batch(request: schemas.FoodSearchBatchRequest, current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """
+    Search many foods in one round-trip (e.g. a recipe's ingredients). Streams
+    NDJSON, one line per distinct food as its search finishes:
+    {"queries": [submitted names], "products": [...]}
+    """
+    if len(request.food_names) > MAX_SEARCH_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SEARCH_BATCH} foods per batch")
+
+    async def lines():
+        async for queries, result in search_foods_batch(request.food_names):
+            yield json.dumps({"queries": queries, **result}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/search-food-cache-stats/")
+def search_food_cache_stats(current_user: models.UserProfile = Depends(auth.get_current_active_user)):
+    """Hit/miss/eviction counters for the food search cache"""
+    return get_search_cache_stats()
+
 # Health Profile
 @app.get("/health-profile/", response_model=schemas.UserHealthProfile)
 def get_health_profile(db: Session = Depends(get_db), current_user: models.UserProfile = Depends(auth.get_current_active_user)):
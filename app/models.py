@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -49,11 +49,29 @@ class DailyLog(Base):
     user_id = Column(Integer, ForeignKey("user_profiles.id"))
     food = relationship("Food")
 
+    __table_args__ = (
+        # A user's logs for a day (log lists, daily totals)
+        Index("ix_daily_logs_user_id_date", "user_id", "date"),
+        # Duplicate check when logging the same food twice on a day
+        Index("ix_daily_logs_user_id_food_id_date", "user_id", "food_id", "date"),
+    )
+
+# ---------- Daily Totals ----------
+class DailyTotal(Base):
+    """Per-user, per-day sums over daily_logs, kept up to date by the log writes in crud.py"""
+    __tablename__ = "daily_totals"
+    user_id = Column(Integer, ForeignKey("user_profiles.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)
+    carbs = Column(Float, nullable=False, default=0)
+    fats = Column(Float, nullable=False, default=0)
+
 # ---------- User Goals ----------
 class UserGoal(Base):
     __tablename__ = "user_goals"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("user_profiles.id"))
+    user_id = Column(Integer, ForeignKey("user_profiles.id"), index=True)
     calories_goal = Column(Float)
     protein_goal = Column(Float)
     carbs_goal = Column(Float)
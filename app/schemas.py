@@ -37,6 +37,9 @@ class DailyLogBase(BaseModel):
 class DailyLogCreate(DailyLogBase):
     date: str
 
+class DailyLogBulkCreate(BaseModel):
+    logs: List[DailyLogCreate]
+
 class DailyLogUpdate(BaseModel):
     quantity: Optional[float] = None
     food_id: Optional[int] = None
@@ -58,6 +61,25 @@ class DailyTotals(BaseModel):
     carbs: float
     fats: float
 
+class TotalsPeriod(BaseModel):
+    period_start: date
+    period_end: date
+    logged_days: int
+    totals: Optional[Dict[str, Optional[float]]] = None
+    daily_average: Optional[Dict[str, Optional[float]]] = None
+    rolling_average: Optional[Dict[str, Optional[float]]] = None
+    goal_ratio: Optional[Dict[str, Optional[float]]] = None
+    days_on_target: Optional[int] = None
+
+class TotalsRange(BaseModel):
+    start: date
+    end: date
+    granularity: str
+    logged_days: int
+    goals: Optional[Dict[str, Optional[float]]] = None
+    adherence: Optional[float] = None  # share of logged days within 10% of the calorie goal
+    periods: List[TotalsPeriod]
+
 # ---------- Goals ----------
 class UserGoalBase(BaseModel):
     calories_goal: float
@@ -104,6 +126,29 @@ class FactOut(BaseModel):
     recommended: bool
     reason: str
 
+class RetrievedFact(BaseModel):
+    score: float
+    fact: str
+    meta: Dict[str, Any]
+
+class NutrientRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class FactBatchRequest(BaseModel):
+    queries: List[str]
+    k: int = 3
+    lexical_weight: Optional[float] = None
+    # e.g. {"calories_100g": {"max": 200}, "protein_100g": {"min": 10}}
+    filters: Optional[Dict[str, NutrientRange]] = None
+
+class FactBatchResult(BaseModel):
+    query: str
+    facts: List[RetrievedFact]
+
+class FoodSearchBatchRequest(BaseModel):
+    food_names: List[str]
+
 class ChatRequest(BaseModel):
     query: str
     context: Optional[Dict[str, Any]] = None
@@ -1,71 +1,203 @@
-
-import requests
+import asyncio
+import os
 import time
+from app.services.search_cache import SearchCache, SEARCH_CACHE_STALE_TTL
+from app.services.openfoodfacts_client import off_client
+from app.services.single_flight import AsyncSingleFlight
+from app.services.ranking import rank_products, NameRanker
+from app.services.local_catalog import local_catalog, product_from_nutrition_db
+from app.services.fuzzy_names import correct_food_name
+from app.services.upstream_health import upstream_health
 
-# Simple in-memory cache with consistent behavior
-_cache = {}
 _CACHE_DURATION = 86400  # 24 hours for aggressive caching
+_NEGATIVE_CACHE_DURATION = 600  # "no results" is remembered briefly so misspellings don't hammer upstream
+
+# Bounded in-process LRU backed by a SQLite file shared by all workers (see search_cache.py).
+# Expired entries with products are served stale for up to SEARCH_CACHE_STALE_TTL while refreshed.
+_cache = SearchCache(ttl=_CACHE_DURATION, stale_ttl=SEARCH_CACHE_STALE_TTL)
+
+# Concurrent misses for the same cache_key share one upstream search
+_async_search_flights = AsyncSingleFlight()
+
+# Background stale-while-revalidate refreshes
+_refresh_tasks: set[asyncio.Task] = set()
+
+# (nutrition DB keys, NameRanker) for the local fallback
+_local_ranker = None
+
+# Searches run at once by batch requests, across all of them in the process
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "8"))
+_batch_limit = None  # (event loop, asyncio.Semaphore)
+
+def get_search_cache_stats():
+    stats = _cache.stats()
+    stats["single_flight"] = _async_search_flights.stats()
+    stats["upstream"] = upstream_health.stats()
+    return stats
+
+def _get_cached(food_name: str, cache_key: str, current_time: float):
+    """Cache entry worth serving (fresh, or stale with products), or None"""
+    entry = _cache.get(cache_key)
+    if entry is None:
+        return None
+    fresh = entry.is_fresh(current_time)
+    if not fresh and not entry.value.get("products"):
+        return None  # expired negative entries are retried, never served stale
+    age = current_time - entry.stored_at
+    print(f"✅ Returning {'cached' if fresh else 'stale'} results for '{food_name}' (age: {int(age/60)} minutes)")
+    return entry
+
+def _store(cache_key: str, result: dict, current_time: float):
+    ttl = _CACHE_DURATION if result.get("products") else _NEGATIVE_CACHE_DURATION
+    _cache.set(cache_key, result, current_time, ttl=ttl)
+
+def _search_catalog(food_name: str):
+    # LOCAL FIRST: full-text catalog; OpenFoodFacts is only asked on a local miss
+    started = time.perf_counter()
+    products = local_catalog.search(food_name)
+    if not products:
+        return None
+    print(f"✅ Found {len(products)} results in local catalog for '{food_name}' ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    return {"products": products}
+
+def _local_fallback(food_name: str, cache_key: str, current_time: float):
+    # FALLBACK: Only use local DB if OpenFoodFacts failed/timed out
+    print(f"🔄 Falling back to local database for '{food_name}'...")
+    local_result = _search_local_database(food_name, cache_key, current_time)
+    
+    if local_result.get("products"):
+        print(f"✅ Found {len(local_result['products'])} results in local database (fallback)")
+        return local_result
+    
+    # No results found anywhere
+    print(f"❌ No results found for '{food_name}'")
+    result: dict = {"products": []}
+    _store(cache_key, result, current_time)
+    return result
 
 def search_food_by_name(food_name: str):
     """
-    Search strategy: OpenFoodFacts ONLY, with local DB as 15-second timeout fallback
+    Blocking search_food_by_name_async for scripts and other callers without
+    an event loop. A stale entry's background refresh does not outlive the call.
+    """
+    return asyncio.run(search_food_by_name_async(food_name))
+
+async def search_food_by_name_async(food_name: str):
+    """
+    Search strategy: typo correction, cache, then the local full-text catalog, then
+    OpenFoodFacts with the nutrition DB as fallback. OpenFoodFacts is queried through
+    the shared, connection-pooled async client with hedged requests across the .org
+    and .net mirrors.
     """
     
+    # Typos of known foods ("chiken") share the canonical name's cache entry
+    food_name = correct_food_name(food_name)
     cache_key = food_name.lower().strip()
     current_time = time.time()
     
-    # Check cache first
-    if cache_key in _cache:
-        cached_data, timestamp = _cache[cache_key]
-        age = current_time - timestamp
-        
-        if age < _CACHE_DURATION:
-            print(f"✅ Returning cached results for '{food_name}' (age: {int(age/60)} minutes)")
-            return cached_data
+    # The SQLite cache tier and the FTS catalog block, so they run in worker threads
+    entry = await asyncio.to_thread(_get_cached, food_name, cache_key, current_time)
+    if entry is not None:
+        if not entry.is_fresh(current_time):
+            task = asyncio.create_task(
+                _async_search_flights.do(("refresh", cache_key), lambda: _refresh_async(food_name, cache_key))
+            )
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return entry.value
+    
+    catalog_result = await asyncio.to_thread(_search_catalog, food_name)
+    if catalog_result is not None:
+        return catalog_result
+    
+    return await _async_search_flights.do(cache_key, lambda: _search_uncached_async(food_name, cache_key, current_time))
+
+def _batch_semaphore() -> asyncio.Semaphore:
+    # asyncio semaphores are bound to the loop they were first used on
+    global _batch_limit
+    loop = asyncio.get_running_loop()
+    if _batch_limit is None or _batch_limit[0] is not loop:
+        _batch_limit = (loop, asyncio.Semaphore(SEARCH_BATCH_CONCURRENCY))
+    return _batch_limit[1]
+
+async def search_foods_batch(food_names):
+    """
+    Search many foods at once, yielding (queries, result) as each search
+    finishes; `queries` are the submitted names the result answers. Names
+    that are the same food after typo correction are searched once. Fresh
+    cache hits come first, then the misses as they complete, at most
+    SEARCH_BATCH_CONCURRENCY of them in flight across every batch.
+    """
+    unique = {}
+    for name in food_names:
+        if not name.strip():
+            continue
+        food_name = correct_food_name(name)
+        unique.setdefault(food_name.lower().strip(), (food_name, []))[1].append(name)
+
+    misses = []
+    for cache_key, (food_name, queries) in unique.items():
+        entry = await asyncio.to_thread(_cache.peek, cache_key)
+        if entry is not None and entry.is_fresh():
+            yield queries, await search_food_by_name_async(food_name)
+        else:
+            misses.append((food_name, queries))
+
+    semaphore = _batch_semaphore()
+
+    async def search(food_name, queries):
+        async with semaphore:
+            try:
+                return queries, await search_food_by_name_async(food_name)
+            except Exception as e:
+                print(f"⚠️ Batch search failed for '{food_name}': {e}")
+                return queries, {"products": [], "error": f"Food search failed: {e}"}
+
+    tasks = [asyncio.create_task(search(food_name, queries)) for food_name, queries in misses]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The client went away mid-stream
+        for task in tasks:
+            task.cancel()
+
+async def _search_uncached_async(food_name: str, cache_key: str, current_time: float):
+    entry = await asyncio.to_thread(_cache.peek, cache_key)
+    if entry is not None and entry.is_fresh():
+        return entry.value
     
-    # PRIMARY: Try OpenFoodFacts with 15-second timeout
     print(f"🔍 Searching OpenFoodFacts for '{food_name}' (15s timeout)...")
     try:
-        result = _search_openfoodfacts(food_name, cache_key, current_time, timeout=15.0)
-        
-        if result.get("products"):
-            print(f"✅ Found {len(result['products'])} results from OpenFoodFacts")
-            return result
-        else:
-            print(f"⚠️ OpenFoodFacts returned no results for '{food_name}'")
+        data = await off_client.search(_search_params(food_name), timeout=15.0)
+        if data:
+            result = _rank_products(data, food_name)
+            if result.get("products"):
+                await asyncio.to_thread(_store, cache_key, result, current_time)
+                print(f"✅ Found {len(result['products'])} results from OpenFoodFacts")
+                return result
+        print(f"⚠️ OpenFoodFacts returned no results for '{food_name}'")
     
     except Exception as e:
         print(f"⚠️ OpenFoodFacts failed: {e}")
     
-    # FALLBACK: Only use local DB if OpenFoodFacts failed/timed out
-    print(f"🔄 Falling back to local database for '{food_name}'...")
-    local_result = _search_local_database(food_name, cache_key, current_time)
-    
-    if local_result.get("products"):
-        print(f"✅ Found {len(local_result['products'])} results in local database (fallback)")
-        return local_result
-    
-    # No results found anywhere
-    print(f"❌ No results found for '{food_name}'")
-    return {"products": []}
+    return await asyncio.to_thread(_local_fallback, food_name, cache_key, current_time)
 
-def _search_openfoodfacts(food_name: str, cache_key: str, current_time: float, timeout: float = 15.0):
-    """Search OpenFoodFacts API with improved speed and reliability"""
-    
-    # SPEED OPTIMIZATION: Use both endpoints in parallel
-    endpoints = [
-        "https://world.openfoodfacts.org/cgi/search.pl",
-        "https://world.openfoodfacts.net/cgi/search.pl",
-    ]
-    
-    # Better headers to avoid being blocked
-    headers = {
-        'User-Agent': 'NutritionApp/1.0 (Python requests)',
-        'Accept': 'application/json',
-    }
-    
+async def _refresh_async(food_name: str, cache_key: str):
+    current_time = time.time()
+    try:
+        data = await off_client.search(_search_params(food_name), timeout=15.0)
+    except Exception as e:
+        print(f"⚠️ Background refresh failed for '{food_name}': {e}")
+        return
+    if data:
+        result = _rank_products(data, food_name)
+        if result.get("products"):
+            await asyncio.to_thread(_store, cache_key, result, current_time)
+
+def _search_params(food_name: str) -> dict:
     # SPEED OPTIMIZATION: Get more candidates but only essential fields
-    params = {
+    return {
         "search_terms": food_name,
         "search_simple": 1,
         "action": "process",
@@ -74,98 +206,22 @@ def _search_openfoodfacts(food_name: str, cache_key: str, current_time: float, t
         "sort_by": "unique_scans_n",  # CRITICAL FIX: Sort by popularity (staples vs obscure brands)
         "fields": "product_name,brands,nutriments,serving_size,ingredients_text,lang"
     }
-    
-    # Try both endpoints in parallel with configurable timeout
-    import concurrent.futures
-    
-    def try_endpoint(url):
-        """Try a single endpoint with configurable timeout"""
-        try:
-            session = requests.Session()
-            session.headers.update(headers)
-            
-            response = session.get(
-                url, 
-                params=params, 
-                timeout=timeout,  # Use configurable timeout (15s)
-                allow_redirects=True
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                products = data.get("products", [])
-                
-                if products:
-                    return (True, data, url)
-            return (False, None, url)
-        except:
-            return (False, None, url)
-    
-    # Try both endpoints in parallel (whichever responds first wins!)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        futures = [executor.submit(try_endpoint, url) for url in endpoints]
-        
-        # Wait for first successful response (or all to fail)
-        for future in concurrent.futures.as_completed(futures, timeout=4):
-            success, data, url = future.result()
-            if success:
-                print(f"✅ Found {len(data.get('products', []))} products from OpenFoodFacts ({url})!")
-                
-                # Process and score products  
-                products = data.get("products", [])
-                scored_products = []
-                search_lower = food_name.lower().strip()
-                
-                for product in products:
-                    product_name = product.get("product_name", "").lower().strip()
-                    if not product_name:
-                        continue
-                        
-                    # HEAVILY favor exact matches and short names
-                    score = 0
-                    word_count = len(product_name.split())
-                    
-                    # Exact match - ABSOLUTE PRIORITY
-                    if product_name == search_lower:
-                        score = 10000  # Massively higher than anything else
-                    # Starts with search
-                    elif product_name.startswith(search_lower):
-                        # HEAVILY penalize extra words
-                        score = 1000 - (word_count * 200)  # Each extra word costs 200 points
-                    # Contains as whole word
-                    elif f" {search_lower} " in f" {product_name} ":
-                        score = 500 - (word_count * 100)
-                    # Contains anywhere
-                    elif search_lower in product_name:
-                        score = 300 - (word_count * 50)
-                    else:
-                        # Partial match
-                        words = search_lower.split()
-                        matches = sum(1 for word in words if word in product_name)
-                        score = matches * 50 - (word_count * 25)
-                    
-                    # Ensure serving_size exists
-                    product["serving_size"] = product.get("serving_size", "100g")
-                    
-                    if score > 0:
-                        scored_products.append((score, product))
-                
-                # Sort by score and take top 5
-                scored_products.sort(key=lambda x: x[0], reverse=True)
-                data["products"] = [product for score, product in scored_products[:5]]
-                
-                # Cache the result
-                _cache[cache_key] = (data, current_time)
-                
-                return data
-    
-    # All endpoints failed
-    print(f"❌ OpenFoodFacts failed for '{food_name}' - using local database")
-    return {"products": []}
+
+def _rank_products(data: dict, food_name: str) -> dict:
+    """Score OpenFoodFacts products against the search and keep the top 5"""
+    data["products"] = rank_products(data.get("products", []), food_name)
+    return data
+
+def _local_db_ranker(local_db: dict) -> NameRanker:
+    """NameRanker over the local nutrition DB keys, rebuilt only when the DB changes"""
+    global _local_ranker
+    keys = tuple(local_db)
+    if _local_ranker is None or _local_ranker[0] != keys:
+        _local_ranker = (keys, NameRanker([key.replace("_", " ") for key in keys]))
+    return _local_ranker[1]
 
 def _search_local_database(food_name: str, cache_key: str, current_time: float):
     """Search local nutrition database as fallback"""
-    search_lower = food_name.lower().strip()
     
     # Import local database
     try:
@@ -174,50 +230,19 @@ def _search_local_database(food_name: str, cache_key: str, current_time: float):
     except:
         local_db = {}
     
-    # Find matches in local database
-    matches = []
-    for db_key, nutrition in local_db.items():
-        db_key_lower = db_key.lower()
-        score = 0
-        
-        # Exact match
-        if db_key_lower == search_lower:
-            score = 100
-        # Contains search term
-        elif search_lower in db_key_lower:
-            score = 80
-        # Fuzzy match
-        else:
-            search_words = set(search_lower.split())
-            db_words = set(db_key_lower.split())
-            common_words = search_words.intersection(db_words)
-            if common_words:
-                score = 60 + (len(common_words) * 10)
-        
-        if score > 50:  # Only include reasonable matches
-            # Convert nutrition data to OpenFoodFacts-like format
-            product = {
-                "product_name": db_key.title(),
-                "nutriments": {
-                    "energy-kcal_100g": nutrition.get("calories", 0),
-                    "proteins_100g": nutrition.get("protein", 0),
-                    "fat_100g": nutrition.get("fat", 0),
-                    "sugars_100g": nutrition.get("sugar", 0),
-                    "carbohydrates_100g": nutrition.get("carbs", 0),
-                    "fiber_100g": nutrition.get("fiber", 0),
-                },
-                "serving_size": nutrition.get("serving_size", "100g"),
-                "_local_fallback": True  # Mark as local data
-            }
-            matches.append((score, product))
-    
-    # Sort by score and return top matches
-    matches.sort(key=lambda x: x[0], reverse=True)
-    products = [product for score, product in matches[:10]]
+    # Same relevance scoring as OpenFoodFacts results, over precomputed key names
+    keys = list(local_db)
+    products = []
+    for i, score in _local_db_ranker(local_db).top(food_name, limit=10):
+        # Convert nutrition data to OpenFoodFacts-like format
+        product = product_from_nutrition_db(keys[i], local_db[keys[i]])
+        product["_local_fallback"] = True  # Mark as local data
+        products.append(product)
     
     result = {"products": products}
     
-    # Cache the result
-    _cache[cache_key] = (result, current_time)
+    # Cache the result (empty results are negative-cached by the caller)
+    if products:
+        _store(cache_key, result, current_time)
     
     return result
@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+
+from app.services.ranking import fold_name
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Trigram overlap (Jaccard) a known name needs before it is checked as a correction
+_MIN_SIMILARITY = 0.45
+# Best trigram candidates verified with the edit distance
+_CANDIDATES = 5
+
+
+def normalize_name(name: str) -> str:
+    """Folded, punctuation-free form names are indexed and looked up by ("Ice_Cream!" -> "ice cream")"""
+    return " ".join(_TOKEN_RE.findall(fold_name(name or "")))
+
+def trigrams(name: str) -> set[str]:
+    """Per-word trigrams, padded like pg_trgm so word starts and ends weigh in"""
+    grams: set[str] = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _max_edits(name: str) -> int:
+    if len(name) <= 3:
+        return 0  # too short to tell a typo from a different food
+    return 1 if len(name) <= 5 else 2
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 once it exceeds `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = char_a != char_b
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyNameIndex:
+    """
+    Typo-tolerant lookup of known food names.
+
+    An inverted index from trigrams to names narrows a query to the few names
+    sharing most of its trigrams; those are verified with a bounded edit
+    distance, so "chiken" resolves to "chicken" but "chicken soup" is never
+    collapsed to "chicken". Lookups touch only the postings of the query's
+    own trigrams and stay well under a millisecond for a few thousand names.
+    """
+
+    def __init__(self, names=(), min_similarity: float = _MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._sizes: list[int] = []
+        self._postings: defaultdict[str, list[int]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.add_names(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self._ids
+
+    def add_names(self, names):
+        with self._lock:
+            for name in names:
+                name = normalize_name(name)
+                if not name or name in self._ids:
+                    continue
+                name_id = len(self.names)
+                grams = trigrams(name)
+                self.names.append(name)
+                self._ids[name] = name_id
+                self._sizes.append(len(grams))
+                for gram in grams:
+                    self._postings[gram].append(name_id)
+
+    def resolve(self, query: str) -> str | None:
+        """The known name `query` is (or is a typo of), or None"""
+        name = normalize_name(query)
+        if name in self._ids:
+            return name
+        limit = _max_edits(name)
+        if not limit:
+            return None
+
+        grams = trigrams(name)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for name_id, count in shared.items():
+            similarity = count / (len(grams) + self._sizes[name_id] - count)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, name_id))
+
+        best = None
+        for similarity, name_id in sorted(scored, reverse=True)[:_CANDIDATES]:
+            distance = edit_distance(name, self.names[name_id], limit)
+            if distance <= limit and (best is None or distance < best[0]):
+                best = (distance, name_id)
+        return self.names[best[1]] if best else None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def _known_food_names():
+    """Names from the local nutrition DB, the recognizer's food mappings and FRESH_FOODS"""
+    from app.services.fresh_food_mapper import FRESH_FOODS
+    yield from FRESH_FOODS
+    try:
+        from app.ai_pipeline.enhanced_image_recognition import food_recognizer
+    except Exception as e:
+        logger.warning(f"Fuzzy name index without the nutrition DB: {e}")
+        return
+    yield from getattr(food_recognizer, 'nutrition_db', {})
+    for label, food in getattr(food_recognizer, 'food_mapping', {}).items():
+        yield label
+        yield food
+
+def get_name_index() -> FuzzyNameIndex:
+    """Process-wide index, built on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FuzzyNameIndex(_known_food_names())
+    return _index
+
+def add_food_names(names):
+    """Make names from the foods table resolvable (called at startup and when foods are created)"""
+    get_name_index().add_names(names)
+
+def correct_food_name(food_name: str) -> str:
+    """`food_name` with a typo of a known food replaced by that food; anything else unchanged"""
+    resolved = get_name_index().resolve(food_name)
+    if resolved is None or resolved == normalize_name(food_name):
+        return food_name
+    print(f"🔤 Interpreting '{food_name}' as '{resolved}'")
+    return resolved
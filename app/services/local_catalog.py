@@ -0,0 +1,265 @@
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from app.services.ranking import rank_products
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CATALOG_PATH = os.getenv("LOCAL_CATALOG_PATH", "data/food_catalog.db")
+
+# FTS candidates re-ranked with the shared relevance scoring per search
+_CANDIDATES = 50
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# OpenFoodFacts product fields kept in the catalog
+_PRODUCT_FIELDS = ("product_name", "brands", "code", "serving_size", "ingredients_text", "categories")
+_NUTRIMENT_FIELDS = ("energy-kcal_100g", "proteins_100g", "carbohydrates_100g", "fat_100g", "sugars_100g",
+                     "fiber_100g", "sodium_100g", "salt_100g", "saturated-fat_100g")
+
+
+def product_from_off(product: dict, source: str = "openfoodfacts") -> dict | None:
+    """Trim an OpenFoodFacts product to the fields search results use."""
+    if not (product.get("product_name") or "").strip():
+        return None
+    trimmed = {field: product[field] for field in _PRODUCT_FIELDS if product.get(field)}
+    nutriments = product.get("nutriments") or {}
+    trimmed["nutriments"] = {key: nutriments[key] for key in _NUTRIMENT_FIELDS if key in nutriments}
+    trimmed["_source"] = source
+    return trimmed
+
+def product_from_fact(meta: dict) -> dict | None:
+    """Product for a data/nutrition_facts.jsonl record's meta."""
+    if not meta.get("name"):
+        return None
+    product = {
+        "product_name": meta["name"],
+        "nutriments": {
+            "energy-kcal_100g": meta.get("calories_100g", 0),
+            "proteins_100g": meta.get("protein_100g", 0),
+            "carbohydrates_100g": meta.get("carbs_100g", 0),
+            "fat_100g": meta.get("fat_100g", 0),
+        },
+        "serving_size": "100g",
+        "_source": "nutrition_facts",
+    }
+    if meta.get("barcode") and meta["barcode"] != "N/A":
+        product["code"] = meta["barcode"]
+    return product
+
+def product_from_nutrition_db(name: str, nutrition: dict) -> dict:
+    """Product for an entry of the image recognizer's nutrition_db (per-100g values)."""
+    return {
+        "product_name": name.title(),
+        "nutriments": {
+            "energy-kcal_100g": nutrition.get("calories", 0),
+            "proteins_100g": nutrition.get("protein", 0),
+            "fat_100g": nutrition.get("fat", 0),
+            "sugars_100g": nutrition.get("sugar", 0),
+            "carbohydrates_100g": nutrition.get("carbs", 0),
+            "fiber_100g": nutrition.get("fiber", 0),
+        },
+        "serving_size": nutrition.get("serving_size", "100g"),
+        "_source": "nutrition_db",
+    }
+
+def product_from_food(food) -> dict | None:
+    """Product for a row of the `foods` table (models.Food)."""
+    if not food.name:
+        return None
+    product = {
+        "product_name": food.name,
+        "nutriments": {
+            "energy-kcal_100g": food.calories or 0,
+            "proteins_100g": food.protein or 0,
+            "carbohydrates_100g": food.carbs or 0,
+            "fat_100g": food.fats or 0,
+        },
+        "serving_size": food.serving_size or "100g",
+        "_source": "foods",
+    }
+    if food.sodium is not None:
+        product["nutriments"]["sodium_100g"] = food.sodium / 1000  # stored as mg per 100g
+    if food.barcode:
+        product["code"] = food.barcode
+    if food.ingredients_text:
+        product["ingredients_text"] = food.ingredients_text
+    return product
+
+def iter_dump_products(path: str):
+    """Stream products from an OpenFoodFacts JSONL export (optionally gzipped)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                product = product_from_off(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if product:
+                yield product
+
+def iter_catalog_sources(facts_path: str | None = "data/nutrition_facts.jsonl", db=None,
+                         include_nutrition_db: bool = True, dump_paths=()):
+    """
+    Products from every local source, most authoritative first (earlier
+    products win on duplicate barcodes/names): the foods table, FRESH_FOODS,
+    the recognizer's nutrition_db, data/nutrition_facts.jsonl, then dumps.
+    """
+    if db is not None:
+        from sqlalchemy.exc import SQLAlchemyError
+        from app import models
+        try:
+            foods = db.query(models.Food).all()
+        except SQLAlchemyError as e:
+            logger.warning(f"Skipping foods table: {e.__class__.__name__}")
+            foods = []
+        for food in foods:
+            product = product_from_food(food)
+            if product:
+                yield product
+
+    from app.services.fresh_food_mapper import FRESH_FOODS
+    for fresh in FRESH_FOODS.values():
+        product = product_from_off(fresh, source="fresh_foods")
+        if product:
+            yield product
+
+    if include_nutrition_db:
+        try:
+            from app.ai_pipeline.enhanced_image_recognition import food_recognizer
+            nutrition_db = getattr(food_recognizer, 'nutrition_db', {})
+        except Exception as e:
+            logger.warning(f"Skipping nutrition_db: {e}")
+            nutrition_db = {}
+        for name, nutrition in nutrition_db.items():
+            yield product_from_nutrition_db(name, nutrition)
+
+    if facts_path and os.path.exists(facts_path):
+        from app.ai.embeddings import record_meta
+        with open(facts_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    product = product_from_fact(record_meta(json.loads(line)))
+                    if product:
+                        yield product
+
+    for dump_path in dump_paths:
+        yield from iter_dump_products(dump_path)
+
+def _dedupe_key(product: dict) -> str:
+    if product.get("code"):
+        return f"code:{product['code']}"
+    return "name:" + " ".join(_TOKEN_RE.findall(product["product_name"].lower()))
+
+def build_catalog(products, path: str = LOCAL_CATALOG_PATH, batch_size: int = 10_000) -> int:
+    """
+    Build the catalog into a temporary file and atomically swap it in, so
+    running searches keep using the old file until they reconnect.
+    Returns the number of products indexed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, dedupe_key TEXT UNIQUE, name TEXT NOT NULL, "
+            "brands TEXT, payload TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE VIRTUAL TABLE products_fts USING fts5(name, brands, content='products', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        batch = []
+        for product in products:
+            batch.append((_dedupe_key(product), product["product_name"], product.get("brands", ""),
+                          json.dumps(product, ensure_ascii=False)))
+            if len(batch) >= batch_size:
+                conn.executemany("INSERT OR IGNORE INTO products (dedupe_key, name, brands, payload) VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT OR IGNORE INTO products (dedupe_key, name, brands, payload) VALUES (?, ?, ?, ?)", batch)
+        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('optimize')")
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return count
+
+
+class LocalCatalog:
+    """
+    Read-only SQLite FTS5 index over local food products, searched before
+    OpenFoodFacts. FTS5 narrows the catalog to a few dozen candidates and
+    the shared relevance scoring (app.services.ranking) orders them exactly
+    like remote results. A missing catalog file just means no local hits.
+    """
+
+    def __init__(self, path: str = LOCAL_CATALOG_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection | None:
+        """Per-thread read-only connection, reopened when the catalog file is rebuilt."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.mtime == mtime:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._local.conn = conn
+        self._local.mtime = mtime
+        return conn
+
+    def _candidates(self, conn: sqlite3.Connection, tokens: list[str]) -> list[dict]:
+        query = " AND ".join(f'"{token}"*' for token in tokens)
+        rows = conn.execute(
+            "SELECT p.payload FROM products_fts JOIN products p ON p.id = products_fts.rowid "
+            "WHERE products_fts MATCH ? ORDER BY bm25(products_fts) LIMIT ?",
+            (query, _CANDIDATES),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(self, food_name: str, limit: int = 5) -> list[dict]:
+        tokens = _TOKEN_RE.findall(food_name.lower())
+        if not tokens:
+            return []
+        try:
+            conn = self._connect()
+            if conn is None:
+                return []
+            # Every term must match: a product matching only some ("Apple" for
+            # "apple juice") is a local miss, left to OpenFoodFacts
+            products = self._candidates(conn, tokens)
+        except sqlite3.Error as e:
+            logger.warning(f"Local catalog search failed for '{food_name}': {e}")
+            return []
+        return rank_products(products, food_name, limit=limit)
+
+    def count(self) -> int:
+        conn = self._connect()
+        return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] if conn else 0
+
+
+# Shared by every request in the process
+local_catalog = LocalCatalog()
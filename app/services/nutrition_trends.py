@@ -0,0 +1,116 @@
+from datetime import date
+
+import numpy as np
+
+NUTRIENTS = ("calories", "protein", "carbs", "fats")
+GRANULARITIES = ("day", "week", "month")
+
+# A logged day is "on target" when its calories are within this fraction of the goal
+ON_TARGET_TOLERANCE = 0.10
+
+
+def _period_starts(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Calendar start (the day, its week's Monday, or the 1st) of the period each day falls in"""
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # 1970-01-01 was a Thursday, so (day number + 3) % 7 is 0 on Mondays
+        return days - (days.astype(np.int64) + 3) % 7
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+def _rolling_mean(values: np.ndarray, logged: np.ndarray, window: int) -> np.ndarray:
+    """Mean over the logged days among the last `window` days, for every day (NaN if none were logged)"""
+    sums = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values * logged[:, None]]), axis=0)
+    counts = np.cumsum(np.concatenate([[0], logged.astype(np.int64)]))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    window_counts = (counts[ends] - counts[starts])[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, (sums[ends] - sums[starts]) / window_counts, np.nan)
+
+def _as_dict(row: np.ndarray) -> dict | None:
+    if np.isnan(row).all():
+        return None
+    return {name: None if np.isnan(value) else round(float(value), 2) for name, value in zip(NUTRIENTS, row)}
+
+def summarize_totals(rows, start: date, end: date, granularity: str = "day",
+                     goals: dict | None = None, window: int = 7) -> dict:
+    """
+    Trend view over daily totals between start and end (inclusive).
+
+    `rows` are (date, calories, protein, carbs, fats) for the days that have
+    logs; rows from the `window - 1` days before start feed the rolling
+    average of the first days. Each day/week/month period gets its totals,
+    the average over its logged days, the `window`-day rolling average at
+    its last day and, when `goals` are given, the average as a fraction of
+    each goal plus how many logged days landed within ON_TARGET_TOLERANCE
+    of the calorie goal.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if end < start:
+        raise ValueError("end must not be before start")
+
+    lead = max(window, 1) - 1
+    days = np.arange(np.datetime64(start, "D") - lead, np.datetime64(end, "D") + 1)
+    values = np.zeros((len(days), len(NUTRIENTS)))
+    logged = np.zeros(len(days), dtype=bool)
+    for row in rows:
+        offset = (np.datetime64(row[0], "D") - days[0]).astype(np.int64)
+        if 0 <= offset < len(days):
+            values[offset] = row[1:5]
+            logged[offset] = True
+    rolling_by_day = _rolling_mean(values, logged, window)[lead:]
+    days, values, logged = days[lead:], values[lead:], logged[lead:]
+
+    period_ids = np.unique(_period_starts(days, granularity), return_inverse=True)[1]
+    period_count = int(period_ids.max()) + 1
+    totals = np.stack([np.bincount(period_ids, weights=values[:, i], minlength=period_count)
+                       for i in range(len(NUTRIENTS))], axis=1)
+    logged_days = np.bincount(period_ids, weights=logged, minlength=period_count).astype(np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = np.where(logged_days[:, None] > 0, totals / logged_days[:, None], np.nan)
+    # First and last day of each period inside the range
+    boundaries = period_ids[1:] != period_ids[:-1]
+    period_firsts = np.flatnonzero(np.r_[True, boundaries])
+    period_ends = np.flatnonzero(np.r_[boundaries, True])
+    rolling = rolling_by_day[period_ends]
+
+    goal_values = None
+    on_target_days = None
+    if goals:
+        goal_values = np.array([goals.get(name) or np.nan for name in NUTRIENTS], dtype=float)
+        if goal_values[0] > 0:
+            on_target = logged & (np.abs(values[:, 0] - goal_values[0]) <= ON_TARGET_TOLERANCE * goal_values[0])
+            on_target_days = np.bincount(period_ids, weights=on_target, minlength=period_count).astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = averages / np.where(goal_values > 0, goal_values, np.nan)
+
+    periods = []
+    for i in range(period_count):
+        period = {
+            "period_start": days[period_firsts[i]].astype(date),
+            "period_end": days[period_ends[i]].astype(date),
+            "logged_days": int(logged_days[i]),
+            "totals": _as_dict(totals[i]),
+            "daily_average": _as_dict(averages[i]),
+            "rolling_average": _as_dict(rolling[i]),
+        }
+        if goal_values is not None:
+            period["goal_ratio"] = _as_dict(ratios[i])
+            period["days_on_target"] = None if on_target_days is None else int(on_target_days[i])
+        periods.append(period)
+
+    total_logged = int(logged.sum())
+    summary = {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "logged_days": total_logged,
+        "goals": None if goal_values is None else _as_dict(goal_values),
+        "adherence": None,
+        "periods": periods,
+    }
+    if on_target_days is not None and total_logged:
+        summary["adherence"] = round(float(on_target_days.sum()) / total_logged, 4)
+    return summary
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.services.upstream_health import upstream_health, UpstreamHealth, CircuitOpenError, is_server_error
+
+logger = logging.getLogger(__name__)
+
+OFF_SEARCH_ENDPOINTS = (
+    "https://world.openfoodfacts.org/cgi/search.pl",
+    "https://world.openfoodfacts.net/cgi/search.pl",
+)
+OFF_MAX_CONNECTIONS_PER_HOST = int(os.getenv("OFF_MAX_CONNECTIONS_PER_HOST", "8"))
+# Seconds to wait on a mirror before hedging the same request to the next one
+OFF_HEDGE_DELAY = float(os.getenv("OFF_HEDGE_DELAY", "0.75"))
+
+OFF_HEADERS = {
+    'User-Agent': 'NutritionApp/1.0 (Python httpx)',
+    'Accept': 'application/json',
+}
+
+
+class OpenFoodFactsClient:
+    """
+    Async OpenFoodFacts search client.
+
+    One keep-alive httpx.AsyncClient is shared by every request, so searches
+    reuse TCP/TLS connections instead of opening a new session per call.
+    Concurrent requests are capped per host with a semaphore. A search goes
+    to the first mirror and is hedged to the next one if no answer arrives
+    within `hedge_delay` (or immediately if the first one fails); the first
+    response with products wins and the rest are cancelled. Mirrors whose
+    circuit is open (see upstream_health.py) are skipped without a request,
+    and per-request timeouts follow each mirror's observed latency.
+    """
+
+    def __init__(self, endpoints=OFF_SEARCH_ENDPOINTS, per_host_limit: int = OFF_MAX_CONNECTIONS_PER_HOST,
+                 hedge_delay: float = OFF_HEDGE_DELAY, transport: httpx.AsyncBaseTransport | None = None,
+                 health: UpstreamHealth = upstream_health):
+        self.endpoints = tuple(endpoints)
+        self.per_host_limit = per_host_limit
+        self.hedge_delay = hedge_delay
+        self.health = health
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # httpx clients and asyncio semaphores are bound to the loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            hosts = {urlsplit(url).netloc for url in self.endpoints}
+            self._client = httpx.AsyncClient(
+                headers=OFF_HEADERS,
+                follow_redirects=True,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=self.per_host_limit * len(hosts),
+                    max_keepalive_connections=self.per_host_limit * len(hosts),
+                    keepalive_expiry=60.0,
+                ),
+            )
+            self._semaphores = {host: asyncio.Semaphore(self.per_host_limit) for host in hosts}
+            self._loop = loop
+        return self._client
+
+    async def _fetch(self, url: str, params: dict, timeout: float) -> dict | None:
+        client = self._get_client()
+        health = self.health.host(url)
+        async with self._semaphores[urlsplit(url).netloc]:
+            if not health.allow():
+                raise CircuitOpenError(health.host)
+            started = time.monotonic()
+            try:
+                response = await client.get(url, params=params, timeout=health.timeout(timeout))
+            except httpx.HTTPError:
+                health.record_failure()
+                raise
+        if is_server_error(response.status_code):
+            health.record_failure()
+            return None
+        health.record_success(time.monotonic() - started)
+        if response.status_code != 200:
+            return None
+        # An empty result is an answer too; the other mirror serves the same catalog
+        return response.json()
+
+    async def search(self, params: dict, timeout: float = 15.0) -> dict | None:
+        """
+        Run a search against the mirrors with hedging. Returns the first
+        successful response, with or without products, or None if every mirror
+        failed or the overall `timeout` expired. The next mirror is only tried
+        when the previous one errors or is slower than `hedge_delay`. Returns
+        None at once while every mirror's circuit is open.
+        """
+        try:
+            return await asyncio.wait_for(self._hedged_search(params, timeout), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"OpenFoodFacts search timed out after {timeout}s")
+            return None
+
+    async def _hedged_search(self, params: dict, timeout: float) -> dict | None:
+        pending = set()
+        try:
+            for position, url in enumerate(self.endpoints):
+                pending.add(asyncio.create_task(self._fetch(url, params, timeout)))
+                is_last = position == len(self.endpoints) - 1
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=None if is_last else self.hedge_delay,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        if task.exception() is not None:
+                            logger.info(f"OpenFoodFacts mirror failed: {task.exception()!r}")
+                        elif task.result() is not None:
+                            return task.result()
+                    if not is_last:
+                        # Hedge timer fired or a mirror failed: bring in the next mirror now
+                        break
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared by every request in the process
+off_client = OpenFoodFactsClient()
@@ -0,0 +1,103 @@
+import unicodedata
+
+import numpy as np
+
+def fold_name(text: str) -> str:
+    """Lowercase, strip and drop accents, so "Crème" matches a "creme" search"""
+    text = text.lower().strip()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def score_product_name(product_name: str, search_lower: str) -> int:
+    """
+    Relevance of a product name to a (lowercased, stripped) search.
+    HEAVILY favors exact matches and short names; <= 0 means "not a match".
+    Reference implementation of NameRanker.scores for a single name.
+    """
+    word_count = len(product_name.split())
+
+    # Exact match - ABSOLUTE PRIORITY
+    if product_name == search_lower:
+        return 10000  # Massively higher than anything else
+    # Starts with search
+    if product_name.startswith(search_lower):
+        # HEAVILY penalize extra words
+        return 1000 - (word_count * 200)  # Each extra word costs 200 points
+    # Contains as whole word
+    if f" {search_lower} " in f" {product_name} ":
+        return 500 - (word_count * 100)
+    # Contains anywhere
+    if search_lower in product_name:
+        return 300 - (word_count * 50)
+    # Partial match
+    words = search_lower.split()
+    matches = sum(1 for word in words if word in product_name)
+    return matches * 50 - (word_count * 25)
+
+
+class NameRanker:
+    """
+    Batch relevance scoring over a fixed list of candidate names.
+
+    Folded names, their space-padded forms (for whole-word checks) and word
+    counts are computed once, so each search is a handful of numpy string
+    array ops instead of a Python loop per candidate. Build one per result
+    set for remote results, or keep one around for a static name list such
+    as the local nutrition DB.
+    """
+
+    def __init__(self, names: list[str]):
+        folded = [fold_name(name or "") for name in names]
+        self.names = np.array(folded, dtype=np.str_)
+        self.padded = np.char.add(np.char.add(" ", self.names), " ")
+        self.word_counts = np.array([len(name.split()) for name in folded], dtype=np.int64)
+        self.nonempty = np.char.str_len(self.names) > 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def scores(self, query: str) -> np.ndarray:
+        """score_product_name for every candidate; empty names score 0"""
+        search = fold_name(query)
+        scores = np.zeros(len(self.names), dtype=np.int64)
+        if not len(self.names):
+            return scores
+
+        words = self.word_counts
+        exact = self.names == search
+        prefix = np.char.startswith(self.names, search)
+        whole_word = np.char.find(self.padded, f" {search} ") >= 0
+        contains = np.char.find(self.names, search) >= 0
+
+        matches = np.zeros(len(self.names), dtype=np.int64)
+        for word in search.split():
+            matches += np.char.find(self.names, word) >= 0
+
+        scores = np.select(
+            [exact, prefix, whole_word, contains],
+            [10000, 1000 - words * 200, 500 - words * 100, 300 - words * 50],
+            default=matches * 50 - words * 25,
+        )
+        scores[~self.nonempty] = 0
+        return scores
+
+    def top(self, query: str, limit: int = 5) -> list[tuple[int, int]]:
+        """(candidate index, score) of the best `limit` matches with a positive score, best first"""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores > 0)
+        # Stable sort keeps the upstream (popularity) order among equal scores
+        hits = hits[np.argsort(-scores[hits], kind="stable")][:limit]
+        return [(int(i), int(scores[i])) for i in hits]
+
+
+def rank_products(products: list[dict], food_name: str, limit: int = 5) -> list[dict]:
+    """Score products by name against the search and return the best `limit` matches"""
+    ranker = NameRanker([product.get("product_name") or "" for product in products])
+    ranked = [products[i] for i, _ in ranker.top(food_name, limit)]
+
+    # Ensure serving_size exists
+    for product in ranked:
+        product["serving_size"] = product.get("serving_size", "100g")
+    return ranked
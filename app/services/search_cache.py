@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, NamedTuple
+
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "data/search_cache.db")  # "" disables the disk tier
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+SEARCH_CACHE_DISK_ENTRIES = int(os.getenv("SEARCH_CACHE_DISK_ENTRIES", "50000"))
+# How long past its TTL an entry may still be served while it is refreshed
+SEARCH_CACHE_STALE_TTL = float(os.getenv("SEARCH_CACHE_STALE_TTL", str(7 * 86400)))
+
+# Disk-tier size is enforced every this many writes rather than on each one
+_TRIM_INTERVAL = 100
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    ttl: float
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        return (time.time() if now is None else now) - self.stored_at < self.ttl
+
+
+class SearchCache:
+    """
+    Two-tier cache for food search results.
+
+    An in-process LRU (app.cache.TTLCache) sits in front of a SQLite file in
+    WAL mode that every worker on the host shares and that survives restarts,
+    so a deploy starts with the popular searches still warm. Each entry has
+    its own TTL (default `ttl`) and stays readable for `stale_ttl` seconds
+    after it, so callers can serve it stale while they refresh it; callers
+    check CacheEntry.is_fresh(). If the SQLite file cannot be used, the cache
+    degrades to memory only.
+    """
+
+    def __init__(self, path: str | None = SEARCH_CACHE_PATH, memory_size: int = SEARCH_CACHE_SIZE,
+                 disk_entries: int = SEARCH_CACHE_DISK_ENTRIES, ttl: float = 86400, stale_ttl: float = 0):
+        self.path = path or None
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.disk_entries = disk_entries
+        # Ages are checked against the stored wall-clock time, so the LRU itself never expires entries
+        self.memory = TTLCache(maxsize=memory_size, ttl=None)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_evictions = 0
+
+        if self.path:
+            try:
+                self._connect()
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache disk tier disabled ({self.path}): {e}")
+                self.path = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread SQLite connection; the schema is created on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path is None:
+                raise sqlite3.OperationalError("Search cache has no disk tier")
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, last_access REAL NOT NULL, "
+                "ttl REAL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(search_cache)")}
+            if "ttl" not in columns:
+                # Files written before per-entry TTLs; NULL falls back to the cache-wide ttl
+                conn.execute("ALTER TABLE search_cache ADD COLUMN ttl REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_cache_last_access ON search_cache (last_access)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the entry for `key` if it is fresh or within its stale window, else None."""
+        entry = self._lookup(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if not entry.is_fresh():
+                    self.stale_hits += 1
+        return entry
+
+    def peek(self, key: str) -> CacheEntry | None:
+        """get() without touching the hit/miss counters, for re-checks after a miss."""
+        return self._lookup(key)
+
+    def _readable(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.stored_at < entry.ttl + self.stale_ttl
+
+    def _lookup(self, key: str):
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            if self._readable(entry, now):
+                return entry
+            self.memory.pop(key)
+
+        if not self.path:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, stored_at, ttl FROM search_cache WHERE key = ?", (key,)).fetchone()
+            entry = row and CacheEntry(row[0], row[1], self.ttl if row[2] is None else row[2])
+            if entry is None or not self._readable(entry, now):
+                self.disk_misses += 1
+                return None
+            conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            entry = entry._replace(value=json.loads(entry.value))
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Search cache read failed for '{key}': {e}")
+            return None
+
+        self.disk_hits += 1
+        self.memory.set(key, entry)
+        return entry
+
+    def set(self, key: str, value, stored_at: float | None = None, ttl: float | None = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, CacheEntry(value, stored_at, ttl))
+        if not self.path:
+            return
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, stored_at, last_access, ttl) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, stored_at, ttl),
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Search cache write failed for '{key}': {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % _TRIM_INTERVAL == 0
+        if trim:
+            self.trim()
+
+    def trim(self):
+        """Drop rows past their stale window, then the least recently used rows beyond `disk_entries`."""
+        if not self.path:
+            return
+        try:
+            conn = self._connect()
+            expired = conn.execute(
+                "DELETE FROM search_cache WHERE stored_at + COALESCE(ttl, ?) + ? <= ?",
+                (self.ttl, self.stale_ttl, time.time()),
+            ).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.disk_entries
+            evicted = 0
+            if overflow > 0:
+                evicted = conn.execute(
+                    "DELETE FROM search_cache WHERE key IN "
+                    "(SELECT key FROM search_cache ORDER BY last_access LIMIT ?)", (overflow,)
+                ).rowcount
+            self.disk_evictions += expired + evicted
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache trim failed: {e}")
+
+    def clear(self):
+        self.memory.clear()
+        if self.path:
+            try:
+                self._connect().execute("DELETE FROM search_cache")
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        disk_size = 0
+        if self.path:
+            try:
+                disk_size = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+
+        memory = self.memory.stats()
+        lookups = self.hits + self.misses
+        return {
+            "memory": memory,
+            "disk": {
+                "path": self.path,
+                "size": disk_size,
+                "max_entries": self.disk_entries,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+                "evictions": self.disk_evictions,
+            },
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": memory["evictions"] + self.disk_evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open a host's circuit
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit rejects calls before letting a single probe through
+UPSTREAM_OPEN_SECONDS = float(os.getenv("UPSTREAM_OPEN_SECONDS", "30"))
+# Floor for latency-derived timeouts, so a fast host is not cut off by one slow response
+UPSTREAM_MIN_TIMEOUT = float(os.getenv("UPSTREAM_MIN_TIMEOUT", "1.0"))
+
+# Successful latencies kept per host; timeouts are derived once there are _MIN_SAMPLES
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES = 20
+_TIMEOUT_PERCENTILE = 0.99
+_TIMEOUT_HEADROOM = 2.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit is open."""
+
+    def __init__(self, host: str):
+        super().__init__(f"Circuit open for {host}")
+        self.host = host
+
+
+class HostHealth:
+    """
+    Circuit breaker and latency tracker for one upstream host.
+
+    Closed: calls go through; UPSTREAM_FAILURE_THRESHOLD failures in a row
+    open the circuit. Open: allow() is False, so callers skip straight to
+    their local fallback. After UPSTREAM_OPEN_SECONDS one probe call is let
+    through (half-open); its success closes the circuit, its failure opens
+    it again. Timeouts follow the host's recent p99 latency, capped by the
+    caller's own timeout.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = UPSTREAM_FAILURE_THRESHOLD,
+                 open_seconds: float = UPSTREAM_OPEN_SECONDS, min_timeout: float = UPSTREAM_MIN_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.min_timeout = min_timeout
+        self.state = CLOSED
+        self.latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started: float | None = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _probe_due(self, now: float) -> bool:
+        if self.state == OPEN:
+            return now - self.opened_at >= self.open_seconds
+        # A probe that never reported back (e.g. cancelled) does not hold the circuit forever
+        return self.probe_started is None or now - self.probe_started >= self.open_seconds
+
+    def available(self) -> bool:
+        """Whether allow() would let a call through, without claiming the half-open probe"""
+        with self._lock:
+            return self.state == CLOSED or self._probe_due(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state only one probe is allowed at a time."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self._probe_due(now):
+                self.state = HALF_OPEN
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def timeout(self, default: float) -> float:
+        """Timeout for the next call: p99 latency with headroom, within [min_timeout, default]"""
+        with self._lock:
+            if len(self.latencies) < _MIN_SAMPLES:
+                return default
+            ordered = sorted(self.latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * _TIMEOUT_PERCENTILE))]
+        return min(default, max(self.min_timeout, p99 * _TIMEOUT_HEADROOM))
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.successes += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Upstream {self.host} recovered, closing circuit")
+            self.state = CLOSED
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Upstream {self.host} failing, opening circuit for {self.open_seconds}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies)
+
+        def percentile(q):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3) if ordered else None
+
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "consecutive_failures": self.consecutive_failures,
+            "p50": percentile(0.5),
+            "p99": percentile(_TIMEOUT_PERCENTILE),
+        }
+
+
+class UpstreamHealth:
+    """HostHealth per upstream host, shared by every client in the process."""
+
+    def __init__(self, **host_options):
+        self.host_options = host_options
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostHealth:
+        """HostHealth for a URL's host (or a bare host name)"""
+        host = urlsplit(url).netloc or url
+        health = self._hosts.get(host)
+        if health is None:
+            with self._lock:
+                health = self._hosts.setdefault(host, HostHealth(host, **self.host_options))
+        return health
+
+    def get(self, url: str, timeout: float, session=None, **kwargs) -> requests.Response:
+        """
+        requests GET through the host's circuit breaker with an adaptive timeout.
+        Raises CircuitOpenError without calling the host while it is open.
+        """
+        health = self.host(url)
+        if not health.allow():
+            raise CircuitOpenError(health.host)
+        started = time.monotonic()
+        try:
+            response = (session or requests).get(url, timeout=health.timeout(timeout), **kwargs)
+        except requests.RequestException:
+            health.record_failure()
+            raise
+        if is_server_error(response.status_code):
+            health.record_failure()
+        else:
+            health.record_success(time.monotonic() - started)
+        return response
+
+    def stats(self) -> dict:
+        return {host: health.stats() for host, health in list(self._hosts.items())}
+
+
+def is_server_error(status_code: int) -> bool:
+    """Statuses that count against a host: it is down or shedding load"""
+    return status_code >= 500 or status_code == 429
+
+
+# Shared by every request in the process
+upstream_health = UpstreamHealth()
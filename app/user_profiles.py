@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from . import crud, schemas
 from .database import get_db
@@ -14,8 +14,12 @@ def create_profile(profile: schemas.UserProfileCreate, db: Session = Depends(get
 
 # ---------- Get all user profiles ----------
 @router.get("/", response_model=List[schemas.UserProfile])
-def get_profiles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_user_profiles(db=db, skip=skip, limit=limit)
+def get_profiles(response: Response, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, db: Session = Depends(get_db)):
+    # On large tables page with after_id=<X-Next-Cursor of the previous page> instead of skip
+    profiles = crud.get_user_profiles(db=db, skip=skip, limit=limit, after_id=after_id)
+    if profiles and len(profiles) == limit:
+        response.headers["X-Next-Cursor"] = str(profiles[-1].id)
+    return profiles
 
 # ---------- Get single user profile by ID ----------
 @router.get("/{user_id}", response_model=schemas.UserProfile)
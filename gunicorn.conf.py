@@ -0,0 +1,16 @@
+# Gunicorn config for multi-worker deployments
+#
+#   gunicorn app.main:app -c gunicorn.conf.py
+#
+# The app is imported once in the master (preload_app) with RETRIEVER_PRELOAD=1,
+# so the embedding model and the memory-mapped FAISS index / embeddings are
+# loaded before the workers fork and shared copy-on-write / via the page cache.
+import os
+
+os.environ.setdefault("RETRIEVER_PRELOAD", "1")
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
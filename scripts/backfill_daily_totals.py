@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import crud
+from app.database import SessionLocal, engine, Base
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily_totals rollup from daily_logs (backfill or repair).")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's rows")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    started = time.time()
+    try:
+        count = crud.rebuild_daily_totals(db, user_id=args.user_id)
+    finally:
+        db.close()
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt {count} daily_totals rows for {scope} in {time.time() - started:.1f}s")
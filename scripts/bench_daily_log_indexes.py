@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import random
+import tempfile
+import timeit
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+
+NEW_INDEXES = ("ix_daily_logs_user_id_date", "ix_daily_logs_user_id_food_id_date", "ix_user_goals_user_id")
+
+def populate(engine, rows: int, users: int, foods: int, days: int):
+    random.seed(42)
+    start = date(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO foods (id, name, calories, protein, carbs, fats) VALUES (:id, :name, 100, 5, 10, 3)"),
+                     [{"id": i, "name": f"food {i}"} for i in range(1, foods + 1)])
+        conn.execute(text("INSERT INTO user_goals (user_id, calories_goal, protein_goal, carbs_goal, fats_goal) "
+                          "VALUES (:user_id, 2000, 100, 250, 70)"), [{"user_id": i} for i in range(1, users + 1)])
+        batch = []
+        for _ in range(rows):
+            batch.append({"user_id": random.randint(1, users), "food_id": random.randint(1, foods),
+                          "date": start + timedelta(days=random.randrange(days)), "quantity": 1.0})
+            if len(batch) == 50_000:
+                conn.execute(text("INSERT INTO daily_logs (user_id, food_id, date, quantity) "
+                                  "VALUES (:user_id, :food_id, :date, :quantity)"), batch)
+                batch = []
+        if batch:
+            conn.execute(text("INSERT INTO daily_logs (user_id, food_id, date, quantity) "
+                              "VALUES (:user_id, :food_id, :date, :quantity)"), batch)
+        conn.execute(text("ANALYZE"))
+
+def hot_queries(db, user_id: int, food_id: int, log_date: date) -> dict:
+    """The ORM queries behind get_logs_by_date_and_user, get_daily_totals_by_user, create_daily_log's duplicate check and get_user_goals"""
+    from sqlalchemy import func
+    from sqlalchemy.orm import joinedload
+    return {
+        "logs for a day": db.query(models.DailyLog).filter(
+            models.DailyLog.user_id == user_id, models.DailyLog.date == log_date
+        ).options(joinedload(models.DailyLog.food)),
+        "daily totals": db.query(func.sum(models.Food.calories * models.DailyLog.quantity)).select_from(models.DailyLog)
+            .join(models.Food, models.DailyLog.food_id == models.Food.id)
+            .filter(models.DailyLog.user_id == user_id, models.DailyLog.date == log_date),
+        "duplicate check": db.query(models.DailyLog).filter(
+            models.DailyLog.user_id == user_id, models.DailyLog.food_id == food_id, models.DailyLog.date == log_date
+        ),
+        "user goals": db.query(models.UserGoal).filter(models.UserGoal.user_id == user_id),
+    }
+
+def report(engine, label: str, repeat: int):
+    print(f"\n== {label} ==")
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        for name, query in hot_queries(db, user_id=7, food_id=3, log_date=date(2025, 3, 14)).items():
+            sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+            seconds = min(timeit.repeat(query.all, number=1, repeat=repeat))
+            print(f"{name:<16} {seconds * 1e3:>9.3f} ms  " + " | ".join(row[-1] for row in plan))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN and timings of the daily_logs hot queries without/with the composite indexes.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--foods", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for index in NEW_INDEXES:
+                conn.execute(text(f"DROP INDEX {index}"))
+        print(f"Populating {args.rows:,} daily_logs rows for {args.users:,} users...")
+        populate(engine, args.rows, args.users, args.foods, args.days)
+
+        report(engine, "before (primary key indexes only)", args.repeat)
+        with engine.begin() as conn:
+            for table in (models.DailyLog.__table__, models.UserGoal.__table__):
+                for index in table.indexes:
+                    if index.name in NEW_INDEXES:
+                        index.create(conn)
+            conn.execute(text("ANALYZE"))
+        report(engine, "after (composite indexes)", args.repeat)
+        engine.dispose()
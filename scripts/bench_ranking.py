@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import random
+import timeit
+
+from app.services.ranking import NameRanker, fold_name, score_product_name
+
+WORDS = ["banana", "chips", "white", "rice", "brown", "basmati", "paneer", "chicken", "breast", "greek",
+         "yogurt", "oats", "rolled", "almond", "milk", "whole", "wheat", "bread", "dal", "organic", "crème"]
+
+def scalar_scores(names: list[str], query: str) -> list[int]:
+    """The per-product Python loop the search paths used before NameRanker"""
+    search = fold_name(query)
+    return [score_product_name(fold_name(name), search) for name in names]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark: scalar vs vectorized product name scoring.")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    queries = ["banana", "white rice", "chicken breast", "oats", "creme"]
+    print(f"{'candidates':>10} {'scalar ms':>10} {'build ms':>9} {'ranker ms':>10} {'speedup':>8}")
+    for count in args.candidates:
+        names = [" ".join(random.choice(WORDS) for _ in range(random.randint(1, 5))) for _ in range(count)]
+        ranker = NameRanker(names)
+        assert all(list(ranker.scores(q)) == scalar_scores(names, q) for q in queries)
+
+        scalar = min(timeit.repeat(lambda: [scalar_scores(names, q) for q in queries], number=1, repeat=args.repeat))
+        build = min(timeit.repeat(lambda: NameRanker(names), number=1, repeat=args.repeat))
+        vector = min(timeit.repeat(lambda: [ranker.scores(q) for q in queries], number=1, repeat=args.repeat))
+        per_query = len(queries)
+        print(f"{count:>10} {scalar / per_query * 1e3:>10.3f} {build * 1e3:>9.3f} {vector / per_query * 1e3:>10.3f} "
+              f"{scalar / vector:>7.1f}x")
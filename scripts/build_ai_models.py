@@ -13,7 +13,7 @@ def main():
     print("Building RAG index...")
     # Ensure the indexes directory exists
     os.makedirs('app/indexes', exist_ok=True)
-    RAGModule()
+    RAGModule().build_index()
     print("RAG index built and saved.")
 
 if __name__ == "__main__":
@@ -2,8 +2,8 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import os
-from app.ai.embeddings import build_faiss_index
+import argparse
+from app.ai.embeddings import build_faiss_index, INDEX_TYPES
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,10 +15,35 @@ if __name__ == "__main__":
     EMBEDDINGS_PATH = "app/indexes/embeddings.npy"
     METADATA_PATH = "app/indexes/metadata.jsonl"
 
+    parser = argparse.ArgumentParser(description="Build the FAISS index over nutrition facts.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=os.getenv("FAISS_INDEX_TYPE", "flat"),
+                        help="flat (exact), ivf_flat, ivf_pq or hnsw (default: flat)")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: 4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists probed at search time")
+    parser.add_argument("--pq-m", type=int, default=16, help="PQ sub-quantizers (must divide the embedding dim)")
+    parser.add_argument("--pq-nbits", type=int, default=8, help="Bits per PQ code")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    parser.add_argument("--ef-construction", type=int, default=200, help="HNSW efConstruction")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW efSearch at query time")
+    parser.add_argument("--train-sample-size", type=int, default=100_000, help="Vectors sampled to train IVF/PQ")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only encode new/changed facts and tombstone removed ones in the existing index")
+    args = parser.parse_args()
+
     build_faiss_index(
         jsonl_path=JSONL_PATH,
         model_name=EMB_MODEL,
         index_path=FAISS_INDEX_PATH,
         embeddings_path=EMBEDDINGS_PATH,
         metadata_path=METADATA_PATH,
+        index_type=args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        pq_m=args.pq_m,
+        pq_nbits=args.pq_nbits,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+        train_sample_size=args.train_sample_size,
+        incremental=args.incremental,
     )
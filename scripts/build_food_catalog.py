@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.local_catalog import build_catalog, iter_catalog_sources, LOCAL_CATALOG_PATH
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local full-text food catalog searched before OpenFoodFacts.")
+    parser.add_argument("--output", default=LOCAL_CATALOG_PATH, help="Catalog file (default: LOCAL_CATALOG_PATH)")
+    parser.add_argument("--facts", default="data/nutrition_facts.jsonl", help="Nutrition facts JSONL")
+    parser.add_argument("--dump", action="append", default=[],
+                        help="OpenFoodFacts JSONL export (.jsonl or .jsonl.gz); may be repeated")
+    parser.add_argument("--no-foods-table", action="store_true", help="Skip the foods table")
+    parser.add_argument("--no-nutrition-db", action="store_true", help="Skip the image recognizer's nutrition_db")
+    args = parser.parse_args()
+
+    db = None
+    if not args.no_foods_table:
+        from app.database import SessionLocal
+        db = SessionLocal()
+
+    started = time.time()
+    try:
+        count = build_catalog(
+            iter_catalog_sources(facts_path=args.facts, db=db, include_nutrition_db=not args.no_nutrition_db,
+                                 dump_paths=args.dump),
+            path=args.output,
+        )
+    finally:
+        if db is not None:
+            db.close()
+    print(f"Indexed {count} products into {args.output} in {time.time() - started:.1f}s")
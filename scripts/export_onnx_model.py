@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def export_model(model_name: str, output_dir: str, quantize: bool = True, opset: int = 14):
+    """
+    Export the transformer behind a sentence-transformers model to ONNX
+    (token embeddings only; pooling and normalization run in numpy) and
+    optionally write a dynamically int8-quantized copy next to it.
+    Needs torch and transformers, so run it at build time rather than in the API.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(hf_name)
+    model = AutoModel.from_pretrained(hf_name)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)  # writes tokenizer.json for the fast tokenizer
+
+    sample = tokenizer(["paneer — 296 kcal/100g"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported {hf_name} to {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(output_dir, "model_quantized.onnx")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"Wrote int8 model to {quantized_path}")
+
+if __name__ == "__main__":
+    from app.ai.onnx_embeddings import onnx_model_dir
+
+    EMB_MODEL = os.getenv("EMB_MODEL", "all-MiniLM-L6-v2")
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX for the onnxruntime backend.")
+    parser.add_argument("--model", default=EMB_MODEL, help="sentence-transformers model name (default: EMB_MODEL)")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: EMB_ONNX_DIR/<model>)")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip writing the int8 quantized model")
+    parser.add_argument("--opset", type=int, default=14, help="ONNX opset version")
+    args = parser.parse_args()
+
+    export_model(args.model, args.output_dir or onnx_model_dir(args.model), quantize=not args.no_quantize, opset=args.opset)
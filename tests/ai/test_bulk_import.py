@@ -0,0 +1,161 @@
+"""
+Tests for the offline OpenFoodFacts bulk importer.
+"""
+
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from app.ai import fetch_openfoodfacts
+from app.ai.fetch_openfoodfacts import bulk_import, iter_dump_records
+
+NUM_PRODUCTS = 2500
+
+
+def _product(i):
+    nutriments = {"energy-kcal_100g": 100 + i, "proteins_100g": 5, "carbohydrates_100g": 20, "fat_100g": 3}
+    if i % 10 == 0:
+        del nutriments["fat_100g"]  # incomplete products are skipped
+    return {"product_name": f"Food {i}", "code": str(1000 + i), "url": f"https://example.org/{i}",
+            "nutriments": nutriments}
+
+
+class TestBulkImport:
+    """Test cases for bulk_import."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "app.db")
+        self.jsonl_path = os.path.join(self.temp_dir, "products.jsonl.gz")
+        with gzip.open(self.jsonl_path, "wt") as f:
+            for i in range(NUM_PRODUCTS):
+                f.write(json.dumps(_product(i)) + "\n")
+            f.write("{truncated\n")
+
+    def teardown_method(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _foods(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT name, barcode, calories_100g, fat_100g FROM foods ORDER BY id").fetchall()
+        conn.close()
+        return rows
+
+    def test_imports_valid_products(self):
+        stats = bulk_import(self.jsonl_path, db_path=self.db_path, batch_size=1000, chunk_size=100, workers=2)
+
+        assert stats["records"] == NUM_PRODUCTS + 1
+        assert stats["imported"] == NUM_PRODUCTS - NUM_PRODUCTS // 10
+        foods = self._foods()
+        assert len(foods) == stats["imported"]
+        assert foods[0] == ("Food 1", "1001", 101.0, 3.0)
+
+    def test_resumes_from_checkpoint_without_duplicates(self):
+        expected = bulk_import(self.jsonl_path, db_path=self.db_path, batch_size=1000, chunk_size=100, workers=2)
+        expected_foods = self._foods()
+
+        # Roll the database back to the state after the first committed batch
+        conn = sqlite3.connect(self.db_path)
+        first_batch = 1000 - 1000 // 10
+        conn.execute("DELETE FROM foods WHERE id > ?", (first_batch,))
+        conn.execute("UPDATE import_checkpoints SET records_done = 1000, imported = ?", (first_batch,))
+        conn.commit()
+        conn.close()
+
+        stats = bulk_import(self.jsonl_path, db_path=self.db_path, batch_size=1000, chunk_size=100, workers=2)
+        assert stats["imported"] == expected["imported"]
+        assert self._foods() == expected_foods
+
+        # A finished import has nothing left to do
+        assert bulk_import(self.jsonl_path, db_path=self.db_path, workers=1)["imported"] == expected["imported"]
+        assert len(self._foods()) == len(expected_foods)
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        facts_path = os.path.join(self.temp_dir, "facts.jsonl")
+        first = bulk_import(self.jsonl_path, db_path=self.db_path, workers=1, facts_path=facts_path)
+        conn = sqlite3.connect(self.db_path)
+        ids = conn.execute("SELECT id, barcode FROM foods ORDER BY id").fetchall()
+        conn.close()
+
+        again = bulk_import(self.jsonl_path, db_path=self.db_path, workers=1, facts_path=facts_path, resume=False)
+
+        assert again["imported"] == again["updated"] == first["imported"]
+        conn = sqlite3.connect(self.db_path)
+        assert conn.execute("SELECT id, barcode FROM foods ORDER BY id").fetchall() == ids
+        conn.close()
+        with open(facts_path) as f:
+            assert len(f.readlines()) == first["imported"]
+
+    def test_facts_file_matches_checkpoint_after_crash(self):
+        facts_path = os.path.join(self.temp_dir, "facts.jsonl")
+        lookups = fetch_openfoodfacts._existing_food_ids
+        calls = []
+
+        def crash_on_second_batch(conn, keys):
+            # Dies after the batch's facts are written but before its rows commit
+            calls.append(keys)
+            if len(calls) == 2:
+                raise RuntimeError("killed")
+            return lookups(conn, keys)
+
+        with patch.object(fetch_openfoodfacts, "_existing_food_ids", crash_on_second_batch):
+            with pytest.raises(RuntimeError):
+                bulk_import(self.jsonl_path, db_path=self.db_path, batch_size=1000, chunk_size=100,
+                            workers=1, facts_path=facts_path)
+
+        stats = bulk_import(self.jsonl_path, db_path=self.db_path, batch_size=1000, chunk_size=100,
+                            workers=1, facts_path=facts_path)
+
+        with open(facts_path) as f:
+            names = [json.loads(line)["meta"]["name"] for line in f]
+        assert len(names) == len(set(names)) == stats["imported"] == len(self._foods())
+
+    def test_refreshing_a_dump_keeps_later_imports_facts(self):
+        facts_path = os.path.join(self.temp_dir, "facts.jsonl")
+        other_path = os.path.join(self.temp_dir, "other.jsonl")
+        with open(other_path, "w") as f:
+            for i in range(50):
+                f.write(json.dumps({**_product(5000 + i), "product_name": f"Other {i}"}) + "\n")
+
+        first = bulk_import(self.jsonl_path, db_path=self.db_path, workers=1, facts_path=facts_path)
+        other = bulk_import(other_path, db_path=self.db_path, workers=1, facts_path=facts_path)
+        bulk_import(self.jsonl_path, db_path=self.db_path, workers=1, facts_path=facts_path, resume=False)
+
+        with open(facts_path) as f:
+            names = [json.loads(line)["meta"]["name"] for line in f]
+        other_names = [name for name in names if name.startswith("Other")]
+        assert len(other_names) == other["imported"] == 45
+        assert set(names) - set(other_names) == {name for name, *_ in self._foods()} - set(other_names)
+        assert len(names) == 2 * first["imported"] + other["imported"]
+
+    def test_csv_dump_into_app_schema(self):
+        csv_path = os.path.join(self.temp_dir, "products.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(["code", "url", "product_name", "energy-kcal_100g", "proteins_100g",
+                             "carbohydrates_100g", "fat_100g"])
+            writer.writerow(["42", "", "Paneer", "296", "28", "1.2", "20.8"])
+            writer.writerow(["43", "", "Multi\nline name", "100", "1", "1", "1"])
+            writer.writerow(["44", "", "No fat column value", "100", "1", "1", ""])
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE foods (id INTEGER PRIMARY KEY, name TEXT, calories FLOAT, protein FLOAT, "
+                     "carbs FLOAT, fats FLOAT, sodium FLOAT, barcode TEXT, serving_size TEXT, ingredients_text TEXT)")
+        conn.close()
+
+        assert len(list(iter_dump_records(csv_path))) == 3
+        stats = bulk_import(csv_path, db_path=self.db_path, workers=1)
+        assert stats["imported"] == 2
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT name, barcode, calories, protein, carbs, fats FROM foods ORDER BY id").fetchall()
+        conn.close()
+        assert rows[0] == ("Paneer", "42", 296.0, 28.0, 1.2, 20.8)
+        assert rows[1][0] == "Multi\nline name"
@@ -0,0 +1,250 @@
+"""
+Tests for FAISS index building.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.ai.embeddings import build_faiss_index, load_manifest, apply_search_params, INDEX_TYPES
+from app.ai.fact_store import FactStore
+from app.ai import retriever
+
+DIM = 32
+
+
+class FakeSentenceTransformer:
+    """Deterministic bag-of-words encoder standing in for MiniLM."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    encoded = 0
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False):
+        FakeSentenceTransformer.encoded += len(texts)
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % DIM] += 1.0
+        return vectors
+
+
+class IndexBuildCase:
+    """Shared fixture: a small facts JSONL and a temporary index directory."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.jsonl_path = Path(self.temp_dir) / "facts.jsonl"
+        self.names = ["apple", "banana", "paneer", "white rice", "chicken breast", "oats", "dal", "almonds",
+                      "spinach", "yogurt", "egg", "salmon"]
+        self._write_facts(self.names)
+        self.index_path = str(Path(self.temp_dir) / "indexes" / "nutrition.index")
+
+    def _write_facts(self, names, calorie_overrides=None):
+        calorie_overrides = calorie_overrides or {}
+        with open(self.jsonl_path, "w") as f:
+            for name in names:
+                i = self.names.index(name) if name in self.names else len(self.names)
+                calories = calorie_overrides.get(name, 50.0 + i * 20)
+                meta = {"name": name, "calories_100g": calories, "protein_100g": float(i)}
+                f.write(json.dumps({"fact_text": f"{name} — {calories:.0f} kcal/100g", "meta": meta}) + "\n")
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _build(self, **kwargs):
+        FakeSentenceTransformer.encoded = 0
+        fake_module = SimpleNamespace(SentenceTransformer=FakeSentenceTransformer)
+        with patch.dict(sys.modules, {"sentence_transformers": fake_module}):
+            return build_faiss_index(
+                jsonl_path=str(self.jsonl_path),
+                model_name="fake-model",
+                index_path=self.index_path,
+                embeddings_path=str(Path(self.temp_dir) / "indexes" / "embeddings.npy"),
+                metadata_path=str(Path(self.temp_dir) / "indexes" / "metadata.jsonl"),
+                **kwargs,
+            )
+
+
+class TestBuildFaissIndex(IndexBuildCase):
+    """Test cases for build_faiss_index."""
+
+    @pytest.mark.parametrize("index_type", INDEX_TYPES)
+    def test_index_types_find_exact_fact(self, index_type):
+        manifest = self._build(index_type=index_type, pq_m=4)
+
+        assert manifest["index_type"] == index_type
+        assert load_manifest(self.index_path)["index_type"] == index_type
+
+        index = faiss.read_index(self.index_path)
+        apply_search_params(index, load_manifest(self.index_path))
+        assert index.ntotal == 12
+
+        embeddings = np.load(Path(self.temp_dir) / "indexes" / "embeddings.npy")
+        _, indices = index.search(embeddings[2:3], 1)
+        assert indices[0][0] == 2
+
+    def test_search_params_recorded(self):
+        manifest = self._build(index_type="ivf_flat", nlist=4, nprobe=2)
+        assert manifest["params"]["nlist"] == 4
+        assert manifest["params"]["nprobe"] == 2
+
+        index = faiss.read_index(self.index_path)
+        apply_search_params(index, manifest)
+        assert faiss.extract_index_ivf(index).nprobe == 2
+
+    def test_unknown_index_type(self):
+        with pytest.raises(ValueError):
+            self._build(index_type="lsh")
+
+
+class TestIncrementalBuild(IndexBuildCase):
+    """Test cases for incremental index updates."""
+
+    def _rows(self):
+        with open(Path(self.temp_dir) / "indexes" / "metadata.jsonl") as f:
+            return [json.loads(line) for line in f]
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+    def test_only_new_and_changed_facts_are_encoded(self, index_type):
+        self._build(index_type=index_type)
+
+        # Add one fact, change one and drop one
+        names = [name for name in self.names if name != "oats"] + ["lentils"]
+        self._write_facts(names, calorie_overrides={"paneer": 321.0})
+        manifest = self._build(index_type=index_type, incremental=True)
+
+        assert FakeSentenceTransformer.encoded == 2
+        assert manifest["rows"] == 14
+        assert manifest["tombstones"] == 2
+
+        rows = self._rows()
+        live_names = sorted(row["name"] for row in rows if row)
+        assert live_names == sorted(names)
+        assert rows[2] is None  # old paneer row is tombstoned
+        assert rows[-1]["name"] in ("paneer", "lentils")
+
+        facts = FactStore(str(Path(self.temp_dir) / "indexes" / "facts.jsonl"))
+        assert len(facts) == 14
+        assert facts.get(2) == ""
+        assert "321 kcal" in " ".join(facts.get(i) for i in (12, 13))
+        facts.close()
+
+        index = faiss.read_index(self.index_path)
+        expected = 12 if index_type != "hnsw" else 14
+        assert index.ntotal == expected
+
+    def test_unchanged_catalog_encodes_nothing(self):
+        self._build()
+        manifest = self._build(incremental=True)
+        assert FakeSentenceTransformer.encoded == 0
+        assert manifest["tombstones"] == 0
+
+    def test_falls_back_to_full_build(self):
+        manifest = self._build(incremental=True)
+        assert FakeSentenceTransformer.encoded == 12
+        assert manifest["rows"] == 12
+
+    def test_rebuild_replaces_mapped_fact_store(self):
+        self._build()
+        facts_path = str(Path(self.temp_dir) / "indexes" / "facts.jsonl")
+        facts = FactStore(facts_path)
+        inode = os.stat(facts_path).st_ino
+
+        self._write_facts(self.names[:3])
+        self._build()
+
+        # A live worker's mapping of the old file stays intact until it reloads
+        assert os.stat(facts_path).st_ino != inode
+        assert facts.get(11).startswith("salmon")
+        facts.reload()
+        assert len(facts) == 3
+        facts.close()
+
+
+class TestRetrieverPreload(IndexBuildCase):
+    """The retriever loading a built index, memory-mapped or into RAM."""
+
+    def setup_method(self):
+        super().setup_method()
+        indexes = Path(self.temp_dir) / "indexes"
+        resources = ("_index", "_metadata", "_facts", "_manifest", "_embeddings", "_lexical", "_columns", "_live")
+        self.patches = [patch.object(retriever, name, None) for name in resources] + [
+            patch.object(retriever, "_model", FakeSentenceTransformer("fake-model")),
+            patch.object(retriever, "FAISS_INDEX_PATH", self.index_path),
+            patch.object(retriever, "METADATA_PATH", str(indexes / "metadata.jsonl")),
+            patch.object(retriever, "EMBEDDINGS_PATH", str(indexes / "embeddings.npy")),
+            patch.object(retriever, "FACTS_PATH", None),
+        ]
+        for p in self.patches:
+            p.start()
+        retriever.clear_caches()
+
+    def teardown_method(self):
+        if retriever._facts is not None:
+            retriever._facts.close()
+        for p in self.patches:
+            p.stop()
+        retriever.clear_caches()
+        super().teardown_method()
+
+    def _names(self, query):
+        # The filter makes the search read the (mapped) embeddings directly
+        facts = retriever.retrieve_facts(query, k=3, filters={"calories_100g": (0, None)})
+        return [fact["meta"]["name"] for fact in facts]
+
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_preload_and_rebuild_under_live_worker(self, mmap):
+        self._build()
+        with patch.object(retriever, "FAISS_MMAP", mmap):
+            retriever.preload_resources()
+            assert retriever._index is not None
+            assert isinstance(retriever._embeddings, np.memmap) == mmap
+            assert "salmon" in self._names("salmon")
+
+            # A rebuild replaces the files this worker has mapped; it keeps serving the old ones
+            self._write_facts(self.names[:3])
+            self._build()
+            retriever.clear_caches()
+            assert "salmon" in self._names("salmon")
+
+            retriever.reload_resources()
+            assert retriever._index.ntotal == 3
+            assert "salmon" not in self._names("salmon")
+
+    def test_lexical_index_built_on_first_hybrid_query(self):
+        self._build()
+        retriever.preload_resources()
+        retriever.retrieve_facts("salmon", k=3, lexical_weight=0.0)
+        assert retriever._lexical is None
+
+        facts = retriever.retrieve_facts("salmon", k=3, lexical_weight=0.5)
+        assert facts[0]["meta"]["name"] == "salmon"
+        assert retriever._lexical is not None
+
+        retriever.reload_resources()
+        assert retriever._lexical is None
+
+    def test_falls_back_to_ram_when_mmap_fails(self):
+        self._build()
+        read_index = faiss.read_index
+
+        def no_mmap(path, *flags):
+            if flags:
+                raise RuntimeError("mmap not supported")
+            return read_index(path)
+
+        with patch.object(retriever, "FAISS_MMAP", True), patch.object(faiss, "read_index", no_mmap):
+            index = retriever._read_index(self.index_path)
+        assert index.ntotal == 12
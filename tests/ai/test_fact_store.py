@@ -0,0 +1,88 @@
+"""
+Tests for the memory-mapped fact store.
+"""
+
+import json
+import os
+import tempfile
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.ai.fact_store import FactStore, atomic_output
+
+
+class TestFactStore:
+    """Test cases for FactStore."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "facts.jsonl"
+        self._write(["Apple — 52 kcal/100g", "Paneer — 296 kcal/100g", "Rice — 130 kcal/100g"])
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, facts, trailing_newline=True):
+        lines = [json.dumps({"fact_text": fact, "meta": {"name": fact.split(" — ")[0]}}) for fact in facts]
+        content = "\n".join(lines) + ("\n" if trailing_newline else "")
+        with atomic_output(str(self.path)) as tmp_path:
+            Path(tmp_path).write_text(content, encoding="utf-8")
+
+    def test_get_by_row(self):
+        store = FactStore(str(self.path))
+        assert len(store) == 3
+        assert store.get(0) == "Apple — 52 kcal/100g"
+        assert store.get(2) == "Rice — 130 kcal/100g"
+        assert store.get_record(1)["meta"]["name"] == "Paneer"
+        store.close()
+
+    def test_out_of_range_returns_default(self):
+        store = FactStore(str(self.path))
+        assert store.get(3) == ""
+        assert store.get(-1, default="n/a") == "n/a"
+        store.close()
+
+    def test_no_trailing_newline(self):
+        self._write(["Oats — 389 kcal/100g", "Dal — 116 kcal/100g"], trailing_newline=False)
+        store = FactStore(str(self.path))
+        assert len(store) == 2
+        assert store.get(1) == "Dal — 116 kcal/100g"
+        store.close()
+
+    def test_reload_picks_up_new_facts(self):
+        store = FactStore(str(self.path))
+        self._write(["Apple — 52 kcal/100g", "Paneer — 296 kcal/100g", "Rice — 130 kcal/100g", "Egg — 155 kcal/100g"])
+        store.reload()
+        assert len(store) == 4
+        assert store.get(3) == "Egg — 155 kcal/100g"
+        store.close()
+
+    def test_missing_file(self):
+        store = FactStore(str(Path(self.temp_dir) / "missing.jsonl"))
+        assert len(store) == 0
+        assert store.get(0) == ""
+
+    def test_replaced_file_keeps_old_mapping_readable(self):
+        store = FactStore(str(self.path))
+        inode = os.stat(self.path).st_ino
+
+        self._write(["Egg — 155 kcal/100g"])
+
+        # Rewriting in place would truncate the mapping under the store (SIGBUS on read)
+        assert os.stat(self.path).st_ino != inode
+        assert store.get(2) == "Rice — 130 kcal/100g"
+        store.reload()
+        assert len(store) == 1
+        assert store.get(0) == "Egg — 155 kcal/100g"
+        store.close()
+
+    def test_failed_write_keeps_original(self):
+        with pytest.raises(RuntimeError):
+            with atomic_output(str(self.path)) as tmp_path:
+                Path(tmp_path).write_text("partial", encoding="utf-8")
+                raise RuntimeError("disk full")
+
+        assert os.listdir(self.temp_dir) == ["facts.jsonl"]
+        assert len(FactStore(str(self.path))) == 3
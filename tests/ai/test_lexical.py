@@ -0,0 +1,62 @@
+"""
+Tests for the BM25 lexical index and rank fusion.
+"""
+
+import numpy as np
+
+from app.ai.lexical import BM25Index, reciprocal_rank_fusion, normalize_name
+
+
+class TestBM25Index:
+    """Test cases for BM25Index."""
+
+    def setup_method(self):
+        self.documents = [
+            "Original Paneer Cheese original-paneer-cheese-apetina Original Paneer Cheese — 174 kcal/100g",
+            "Apple & Raisin Oat Bars apple-raisin-oat-bars-deliciously-ella Apple & Raisin Oat Bars — 426 kcal/100g",
+            None,  # tombstoned row
+            "Yogurt Bnine BANANA yogurt-bnine-banana-jaouda Yogurt Bnine BANANA — 88 kcal/100g",
+        ]
+        self.names = ["Original Paneer Cheese", "Apple & Raisin Oat Bars", "Mandeln", "Yogurt Bnine BANANA"]
+        self.index = BM25Index(self.documents, self.names)
+
+    def test_brand_query_ranks_product_first(self):
+        hits = self.index.search("Apetina paneer", k=3)
+        assert hits[0][0] == 0
+        assert hits[0][1] > 0
+
+    def test_no_match(self):
+        assert self.index.search("quinoa", k=3) == []
+
+    def test_tombstoned_rows_are_not_indexed(self):
+        assert self.index.num_docs == 3
+        assert self.index.exact_name_rows("mandeln") == []
+
+    def test_exact_name_is_case_and_punctuation_insensitive(self):
+        assert self.index.exact_name_rows("apple & raisin oat bars") == [1]
+        assert self.index.exact_name_rows("  YOGURT bnine banana ") == [3]
+        assert self.index.exact_name_rows("yogurt") == []
+
+    def test_k_limits_results(self):
+        hits = self.index.search("kcal 100g", k=2)
+        assert len(hits) == 2
+
+    def test_mask_restricts_hits(self):
+        mask = np.array([False, True, False, True])
+        hits = self.index.search("kcal 100g", k=3, mask=mask)
+        assert sorted(row for row, _ in hits) == [1, 3]
+
+
+def test_reciprocal_rank_fusion_weights():
+    vector = [1, 2, 3]
+    lexical = [3, 1]
+
+    fused = reciprocal_rank_fusion([vector, lexical], [0.5, 0.5], k=60)
+    assert [row for row, _ in fused][:2] == [1, 3]
+
+    vector_only = reciprocal_rank_fusion([vector, lexical], [1.0, 0.0], k=60)
+    assert [row for row, _ in vector_only] == vector
+
+
+def test_normalize_name():
+    assert normalize_name("Apple & Raisin  Oat-Bars") == "apple raisin oat bars"
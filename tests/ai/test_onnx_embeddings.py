@@ -0,0 +1,91 @@
+"""
+Tests for the onnxruntime embedding backend.
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.ai.onnx_embeddings import OnnxEmbeddingModel, mean_pool, onnx_model_dir
+from app.ai.embeddings import get_embedding_model
+
+MODEL_NAME = os.getenv("EMB_MODEL", "all-MiniLM-L6-v2")
+
+
+class TestMeanPool:
+    """Test cases for attention-masked mean pooling."""
+
+    def test_padding_is_ignored(self):
+        tokens = np.array([[[1.0, 1.0], [3.0, 3.0], [100.0, 100.0]]], dtype=np.float32)
+        mask = np.array([[1, 1, 0]])
+        np.testing.assert_allclose(mean_pool(tokens, mask), [[2.0, 2.0]])
+
+
+class TestOnnxEmbeddingModel:
+    """Test cases for OnnxEmbeddingModel.encode with a stand-in session."""
+
+    def _model(self):
+        pytest.importorskip("tokenizers")
+        from tokenizers import Tokenizer
+        from tokenizers.models import WordLevel
+        from tokenizers.pre_tokenizers import Whitespace
+
+        tokenizer = Tokenizer(WordLevel({"[PAD]": 0, "[UNK]": 1, "paneer": 2, "rice": 3, "white": 4}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = Whitespace()
+        tokenizer.enable_padding()
+
+        # Token embedding per id; "white" maps to the zero vector
+        table = np.array([[9, 9, 9], [0, 1, 0], [0, 0, 2], [2, 0, 0], [0, 0, 0]], dtype=np.float32)
+        session = SimpleNamespace(run=lambda outputs, feeds: [table[feeds["input_ids"]]])
+
+        model = OnnxEmbeddingModel.__new__(OnnxEmbeddingModel)
+        model.tokenizer = tokenizer
+        model.session = session
+        model.batch_size = 2
+        model._input_names = {"input_ids", "attention_mask"}
+        return model
+
+    def test_encode_pools_and_normalizes(self):
+        embeddings = self._model().encode(["paneer", "white rice", "rice"])
+        assert embeddings.shape == (3, 3)
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+        # "paneer" is padded to the length of "white rice"; [PAD] must not leak into its mean
+        np.testing.assert_allclose(embeddings[0], [0, 0, 1])
+        np.testing.assert_allclose(embeddings[2], embeddings[1])
+
+    def test_missing_export(self, tmp_path):
+        pytest.importorskip("onnxruntime")
+        with pytest.raises(FileNotFoundError):
+            OnnxEmbeddingModel(str(tmp_path))
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_embedding_model(MODEL_NAME, backend="tensorrt")
+
+
+class TestOnnxParity:
+    """The exported model must agree with the torch model it was exported from."""
+
+    def test_cosine_agreement_with_torch(self):
+        pytest.importorskip("onnxruntime")
+        sentence_transformers = pytest.importorskip("sentence_transformers")
+        model_dir = onnx_model_dir(MODEL_NAME)
+        if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+            pytest.skip("ONNX export missing; run scripts/export_onnx_model.py")
+
+        texts = [
+            "Original Paneer Cheese — 174 kcal/100g, 22 g protein/100g",
+            "high protein low calorie snack",
+            "white rice",
+            "Apple & Raisin Oat Bars — 426 kcal/100g",
+        ]
+        reference = sentence_transformers.SentenceTransformer(MODEL_NAME).encode(texts, normalize_embeddings=True)
+
+        for quantized, tolerance in ((False, 0.999), (True, 0.98)):
+            onnx_model = OnnxEmbeddingModel(model_dir, quantized=quantized)
+            if quantized and not onnx_model.model_path.endswith("model_quantized.onnx"):
+                continue
+            cosine = (onnx_model.encode(texts) * reference).sum(axis=1)
+            assert cosine.min() > tolerance
@@ -0,0 +1,37 @@
+"""
+Tests for the pipeline RAG module's delegation to the shared retriever.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.ai import retriever
+from app.ai_pipeline import rag_module
+from app.ai_pipeline.rag_module import RAGModule
+
+
+class TestRAGModule:
+
+    def test_retrieve_returns_retriever_results(self):
+        facts = [{"score": 0.9, "fact": "apple — 52 kcal/100g", "meta": {"name": "apple"}}]
+        with patch.object(retriever, "retrieve_facts", return_value=facts) as mock_retrieve:
+            results = RAGModule().retrieve("apple", k=2)
+        mock_retrieve.assert_called_once_with("apple", k=2)
+        assert results == facts
+
+    def test_build_index_writes_retriever_paths(self):
+        with patch.object(rag_module, "build_faiss_index", return_value={"count": 1}) as mock_build, \
+                patch.object(retriever, "_index", None):
+            manifest = RAGModule(data_path="facts.jsonl").build_index(index_type="hnsw")
+        assert manifest == {"count": 1}
+        mock_build.assert_called_once_with(
+            jsonl_path="facts.jsonl",
+            model_name=retriever.EMB_MODEL,
+            index_path=retriever.FAISS_INDEX_PATH,
+            embeddings_path=retriever.EMBEDDINGS_PATH,
+            metadata_path=retriever.METADATA_PATH,
+            index_type="hnsw",
+        )
@@ -0,0 +1,120 @@
+"""
+Tests for batch fact retrieval and its endpoint.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.ai import retriever
+from app.ai.lexical import BM25Index
+
+DIM = 16
+
+
+class FakeEncoder:
+    """Deterministic bag-of-words encoder standing in for MiniLM."""
+
+    def encode(self, texts, convert_to_numpy=True):
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % DIM] += 1.0
+        return vectors
+
+
+class TestRetrieveFactsBatch:
+    """Batch results must match one retrieve_facts call per query."""
+
+    def setup_method(self):
+        names = ["apple", "banana", "paneer", "white rice", "chicken breast", "oats", "dal", "almonds"]
+        metadata = [{"name": name, "calories_100g": 50.0 + i * 40} for i, name in enumerate(names)]
+        facts = [f"{name} — {meta['calories_100g']:.0f} kcal/100g" for name, meta in zip(names, metadata)]
+
+        model = FakeEncoder()
+        embeddings = np.ascontiguousarray(model.encode(facts), dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+        index.add_with_ids(embeddings, np.arange(len(facts), dtype=np.int64))
+
+        self.patches = [
+            patch.object(retriever, "_index", index),
+            patch.object(retriever, "_model", model),
+            patch.object(retriever, "_metadata", metadata),
+            patch.object(retriever, "_facts", SimpleNamespace(get=lambda row: facts[row])),
+            patch.object(retriever, "_manifest", {"index_type": "flat"}),
+            patch.object(retriever, "_embeddings", embeddings),
+            patch.object(retriever, "_lexical", BM25Index(facts, names)),
+            patch.object(retriever, "_columns", retriever._build_nutrient_columns(metadata)),
+            patch.object(retriever, "_live", retriever._build_live_mask(metadata)),
+        ]
+        for p in self.patches:
+            p.start()
+        retriever.clear_caches()
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+        retriever.clear_caches()
+
+    @pytest.mark.parametrize("lexical_weight", [0.0, 0.5])
+    def test_matches_single_queries_in_order(self, lexical_weight):
+        queries = ["white rice", "Banana", "chicken breast", "white rice", "dal"]
+        filters = {"calories_100g": (None, 250)}
+
+        batch = retriever.retrieve_facts_batch(queries, k=3, lexical_weight=lexical_weight, filters=filters)
+        retriever.clear_caches()
+        single = [retriever.retrieve_facts(query, k=3, lexical_weight=lexical_weight, filters=filters)
+                  for query in queries]
+
+        assert batch == single
+        assert batch[0] == batch[3]
+        assert all(fact["meta"]["calories_100g"] <= 250 for facts in batch for fact in facts)
+
+    def test_empty_batch(self):
+        assert retriever.retrieve_facts_batch([]) == []
+
+    def test_unknown_filter_field(self):
+        with pytest.raises(ValueError, match="Cannot filter on 'sugar_100g'"):
+            retriever.retrieve_facts_batch(["apple"], filters={"sugar_100g": (None, 5)})
+
+
+class TestFactsBatchEndpoint:
+    """Request validation of POST /ai/get-nutrition-facts/batch."""
+
+    def setup_method(self):
+        # ai_routes pulls in the barcode scanner, which needs the zbar library
+        self.routes = pytest.importorskip("app.ai.ai_routes", exc_type=ImportError)
+        from fastapi import HTTPException
+        from app.schemas import FactBatchRequest
+        self.HTTPException = HTTPException
+        self.FactBatchRequest = FactBatchRequest
+
+    def test_too_many_queries(self):
+        request = self.FactBatchRequest(queries=["apple"] * (self.routes.MAX_BATCH_QUERIES + 1))
+        with patch.object(self.routes, "retrieve_facts_batch") as mock_batch:
+            with pytest.raises(self.HTTPException) as error:
+                self.routes.get_nutrition_facts_batch(request, current_user=None)
+        assert error.value.status_code == 400
+        mock_batch.assert_not_called()
+
+    def test_invalid_filter(self):
+        request = self.FactBatchRequest(queries=["apple"], filters={"sugar_100g": {"max": 5}})
+        with patch.object(self.routes, "retrieve_facts_batch", side_effect=ValueError("Cannot filter on 'sugar_100g'")):
+            with pytest.raises(self.HTTPException) as error:
+                self.routes.get_nutrition_facts_batch(request, current_user=None)
+        assert error.value.status_code == 400
+        assert "sugar_100g" in error.value.detail
+
+    def test_results_follow_query_order(self):
+        request = self.FactBatchRequest(queries=["banana", "apple"], k=1)
+        facts = [[{"score": 0.9, "fact": "banana", "meta": {}}], [{"score": 0.8, "fact": "apple", "meta": {}}]]
+        with patch.object(self.routes, "retrieve_facts_batch", return_value=facts) as mock_batch:
+            results = self.routes.get_nutrition_facts_batch(request, current_user=None)
+        mock_batch.assert_called_once_with(["banana", "apple"], k=1, lexical_weight=None, filters=None)
+        assert [result["query"] for result in results] == ["banana", "apple"]
+        assert results[1]["facts"] == facts[1]
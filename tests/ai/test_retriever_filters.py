@@ -0,0 +1,72 @@
+"""
+Tests for nutrient range filters in the retriever.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.ai import retriever
+
+
+class TestNutrientFilters:
+    """Test cases for the filter mask and the filtered exact vector search."""
+
+    def setup_method(self):
+        self.metadata = [
+            {"name": "Paneer", "calories_100g": 296, "protein_100g": 28},
+            {"name": "Banana", "calories_100g": 89, "protein_100g": 1.1},
+            None,  # tombstoned row
+            {"name": "Chicken Breast", "calories_100g": 165, "protein_100g": 31},
+            {"name": "Mystery Bar", "protein_100g": 12},
+        ]
+        embeddings = np.eye(5, 4, dtype=np.float32)
+        embeddings[3] = [0.9, 0.1, 0, 0]
+        self.embeddings = embeddings
+        self.patches = [
+            patch.object(retriever, "_metadata", self.metadata),
+            patch.object(retriever, "_columns", retriever._build_nutrient_columns(self.metadata)),
+            patch.object(retriever, "_live", retriever._build_live_mask(self.metadata)),
+            patch.object(retriever, "_embeddings", embeddings),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_range_mask(self):
+        mask = retriever._filter_mask({"calories_100g": (None, 200), "protein_100g": (10, None)})
+        assert np.flatnonzero(mask).tolist() == [3]
+
+    def test_missing_values_and_tombstones_never_match(self):
+        mask = retriever._filter_mask({"calories_100g": (0, None)})
+        assert np.flatnonzero(mask).tolist() == [0, 1, 3]
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            retriever._filter_mask({"sugar_100g": (None, 5)})
+
+    def test_filtered_search_ranks_candidates_only(self):
+        query = np.array([[1, 0, 0, 0]], dtype=np.float32)
+        mask = np.array([False, True, False, True, True])
+        scores, rows = retriever._filtered_vector_search(query, mask, depth=5)
+        assert rows[0].tolist() == [3, 1, 4]
+        assert scores[0][0] == pytest.approx(0.9)
+
+    @pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+    def test_large_candidate_sets_use_faiss_selector(self, index_type):
+        from app.ai.embeddings import create_index
+
+        index, _ = create_index(4, len(self.embeddings), index_type=index_type)
+        index.add_with_ids(self.embeddings, np.arange(len(self.embeddings), dtype=np.int64))
+        query = np.array([[1, 0.5, 0, 0]], dtype=np.float32)
+        mask = np.array([False, True, False, True, True])
+        with patch.object(retriever, "_index", index), \
+                patch.object(retriever, "_manifest", {"index_type": index_type}), \
+                patch.object(retriever, "RETRIEVER_BRUTE_FORCE_MAX", 0):
+            scores, rows = retriever._filtered_vector_search(query, mask, depth=5)
+        assert rows[0].tolist() == [3, 1, 4]
+        assert scores[0].tolist() == pytest.approx([0.95, 0.5, 0])
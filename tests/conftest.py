@@ -1,3 +1,31 @@
 import sys
 import os
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+# Keep food search tests off the shared data/search_cache.db and any locally built catalog
+os.environ.setdefault("SEARCH_CACHE_PATH", "")
+os.environ.setdefault("LOCAL_CATALOG_PATH", "")
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    """Session on an in-memory SQLite database with one user and two foods"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app import models
+    from app.database import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.UserProfile(id=1, email="a@example.com", hashed_password="x"),
+        models.Food(id=1, name="Rice", calories=130, protein=2.7, carbs=28, fats=0.3),
+        models.Food(id=2, name="Chicken", calories=165, protein=31, carbs=0, fats=3.6),
+    ])
+    session.commit()
+    yield session
+    session.close()
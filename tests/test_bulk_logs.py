@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas
+
+
+def _entry(food_id, quantity, log_date="2025-01-01"):
+    return schemas.DailyLogCreate(food_id=food_id, quantity=quantity, date=log_date)
+
+
+def test_bulk_merges_duplicates_and_existing_logs(db):
+    existing = crud.create_daily_log(db, _entry(1, 1), user_id=1)
+
+    logs = crud.create_daily_logs_bulk(db, [_entry(1, 2), _entry(2, 1), _entry(2, 0.5), _entry(1, 1, "2025-01-02")], user_id=1)
+
+    assert [(log.food_id, log.date, log.quantity) for log in logs] == [
+        (1, date(2025, 1, 1), 3), (2, date(2025, 1, 1), 1.5), (1, date(2025, 1, 2), 1),
+    ]
+    assert logs[0].id == existing.id
+    assert logs[1].food.name == "Chicken"
+    assert db.query(models.DailyLog).count() == 3
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-01")["calories"] == pytest.approx(3 * 130 + 1.5 * 165)
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-02")["calories"] == pytest.approx(130)
+
+
+def test_bulk_rejects_whole_batch(db):
+    with pytest.raises(ValueError, match="Food IDs not found: 9"):
+        crud.create_daily_logs_bulk(db, [_entry(1, 1), _entry(9, 1)], user_id=1)
+    with pytest.raises(ValueError, match="Invalid date format"):
+        crud.create_daily_logs_bulk(db, [_entry(1, 1), _entry(2, 1, "01/02/2025")], user_id=1)
+    assert db.query(models.DailyLog).count() == 0
+
+
+def test_bulk_meal_uses_a_fixed_number_of_statements(db):
+    statements = []
+    engine = db.get_bind()
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        crud.create_daily_logs_bulk(db, [_entry(1 if i % 2 else 2, 1) for i in range(10)], user_id=1)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    inserts = [s for s in statements if s.startswith("INSERT INTO daily_logs")]
+    assert len(inserts) == 1  # one executemany
+    assert len(statements) <= 8
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from app.cache import TTLCache
+
+
+def test_get_set_and_stats():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("rice") is None
+    cache.set("rice", [0.1, 0.2])
+    assert cache.get("rice") == [0.1, 0.2]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("apple", 1)
+    cache.set("banana", 2)
+    cache.get("apple")  # apple becomes most recently used
+    cache.set("rice", 3)
+
+    assert cache.get("banana") is None
+    assert cache.get("apple") == 1
+    assert cache.get("rice") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = TTLCache(maxsize=10, ttl=5)
+    with patch("app.cache.time.monotonic", return_value=100.0):
+        cache.set("chicken breast", "vec")
+    with patch("app.cache.time.monotonic", return_value=104.0):
+        assert cache.get("chicken breast") == "vec"
+    with patch("app.cache.time.monotonic", return_value=106.0):
+        assert cache.get("chicken breast") is None
+    assert len(cache) == 0
+
+
+def test_disabled_and_clear():
+    disabled = TTLCache(maxsize=0)
+    disabled.set("banana", 1)
+    assert disabled.get("banana") is None
+
+    cache = TTLCache(maxsize=4)
+    cache.set("banana", 1)
+    cache.clear()
+    assert cache.get("banana") is None
@@ -0,0 +1,19 @@
+from sqlalchemy import create_engine, text
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.database import Base
+
+
+def _plan(conn, sql):
+    return " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_hot_daily_log_queries_use_indexes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        assert "ix_daily_logs_user_id_date" in _plan(
+            conn, "SELECT * FROM daily_logs WHERE user_id = 1 AND date = '2025-01-01'")
+        assert "ix_daily_logs_user_id_food_id_date" in _plan(
+            conn, "SELECT * FROM daily_logs WHERE user_id = 1 AND food_id = 2 AND date = '2025-01-01'")
+        assert "ix_user_goals_user_id" in _plan(conn, "SELECT * FROM user_goals WHERE user_id = 1")
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from app import crud, models, schemas
+
+
+def _log(db, food_id, quantity, log_date="2025-01-01"):
+    return crud.create_daily_log(db, schemas.DailyLogCreate(food_id=food_id, quantity=quantity, date=log_date), user_id=1)
+
+
+def test_create_update_delete_keep_rollup_in_sync(db):
+    rice = _log(db, 1, 2)
+    _log(db, 2, 1)
+    _log(db, 1, 1)  # merged into the first rice log
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-01") == {
+        "calories": pytest.approx(3 * 130 + 165), "protein": pytest.approx(3 * 2.7 + 31),
+        "carbs": pytest.approx(84), "fats": pytest.approx(3 * 0.3 + 3.6),
+    }
+
+    crud.update_daily_log(db, rice.id, schemas.DailyLogUpdate(date="2025-01-02", quantity=1))
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-01")["calories"] == pytest.approx(165)
+    assert crud.get_daily_totals_by_user(db, 1, date(2025, 1, 2))["calories"] == pytest.approx(130)
+
+    crud.delete_daily_log(db, rice.id)
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-02") == {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
+    assert db.get(models.DailyTotal, (1, date(2025, 1, 2))) is None
+
+
+def test_rebuild_repairs_drifted_rollup(db):
+    _log(db, 1, 2)
+    _log(db, 2, 1, log_date="2025-01-03")
+    db.query(models.DailyTotal).update({"calories": 0})
+    db.commit()
+
+    assert crud.rebuild_daily_totals(db) == 2
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-01")["calories"] == pytest.approx(260)
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-03")["calories"] == pytest.approx(165)
+
+
+def test_ensure_daily_totals_only_fills_an_empty_rollup(db):
+    _log(db, 1, 1)
+    db.query(models.DailyTotal).delete()
+    db.commit()
+
+    assert crud.ensure_daily_totals(db) == 1
+    assert crud.ensure_daily_totals(db) == 0
+    assert crud.get_daily_totals_by_user(db, 1, "2025-01-01")["calories"] == pytest.approx(130)
+
+
+def test_invalid_date_raises(db):
+    with pytest.raises(ValueError):
+        crud.get_daily_totals_by_user(db, 1, "yesterday")
+
+
+def test_range_rows_and_goal_targets(db):
+    _log(db, 1, 1, log_date="2025-01-01")
+    _log(db, 2, 1, log_date="2025-01-05")
+    _log(db, 2, 1, log_date="2025-02-01")
+
+    rows = crud.get_daily_totals_range(db, 1, date(2025, 1, 1), date(2025, 1, 31))
+    assert [(row[0], row[1]) for row in rows] == [(date(2025, 1, 1), 130), (date(2025, 1, 5), 165)]
+
+    assert crud.get_goal_targets(db, 1) is None
+    db.add(models.UserGoal(user_id=1, calories_goal=1800, protein_goal=90, carbs_goal=200, fats_goal=60))
+    db.commit()
+    assert crud.get_goal_targets(db, 1)["calories"] == 1800
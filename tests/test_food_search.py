@@ -0,0 +1,168 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+
+from app.services import food_search
+from app.services.openfoodfacts_client import OpenFoodFactsClient
+from app.services.search_cache import SearchCache
+from app.services.single_flight import AsyncSingleFlight
+
+
+class TestStaleWhileRevalidate:
+    """Stale-while-revalidate and negative caching in search_food_by_name_async."""
+
+    def setup_method(self):
+        self.calls = []
+        self.products = [{"product_name": "Banana"}]
+        self.cache = SearchCache(path="", ttl=food_search._CACHE_DURATION, stale_ttl=3600)
+
+        async def handler(request):
+            self.calls.append(request.url.params["search_terms"])
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"products": self.products})
+
+        client = OpenFoodFactsClient(transport=httpx.MockTransport(handler), hedge_delay=5)
+        self.patches = [
+            patch.object(food_search, "off_client", client),
+            patch.object(food_search, "_cache", self.cache),
+            patch.object(food_search, "_async_search_flights", AsyncSingleFlight()),
+            patch.object(food_search, "_search_local_database", lambda *args: {"products": []}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_stale_entry_is_served_and_refreshed_in_background(self):
+        stale_time = time.time() - food_search._CACHE_DURATION - 60
+        self.cache.set("banana", {"products": [{"product_name": "Old Banana"}]}, stored_at=stale_time)
+
+        async def run():
+            started = time.monotonic()
+            result = await food_search.search_food_by_name_async("banana")
+            elapsed = time.monotonic() - started
+            await asyncio.gather(*food_search._refresh_tasks)
+            return result, elapsed
+
+        result, elapsed = asyncio.run(run())
+        assert result["products"][0]["product_name"] == "Old Banana"
+        assert elapsed < 0.05  # did not wait for upstream
+        assert self.calls == ["banana"]
+
+        entry = self.cache.get("banana")
+        assert entry.is_fresh()
+        assert entry.value["products"][0]["product_name"] == "Banana"
+
+    def test_empty_results_are_negative_cached(self):
+        self.products = []
+
+        first = asyncio.run(food_search.search_food_by_name_async("blorple"))
+        second = asyncio.run(food_search.search_food_by_name_async("blorple"))
+
+        assert first == second == {"products": []}
+        assert self.calls == ["blorple"]  # an empty answer is not hedged to the other mirror
+        assert self.cache.get("blorple").ttl == food_search._NEGATIVE_CACHE_DURATION
+
+    def test_expired_negative_entry_is_not_served_stale(self):
+        expired = time.time() - food_search._NEGATIVE_CACHE_DURATION - 1
+        self.cache.set("banana", {"products": []}, stored_at=expired, ttl=food_search._NEGATIVE_CACHE_DURATION)
+
+        result = asyncio.run(food_search.search_food_by_name_async("banana"))
+        assert result["products"][0]["product_name"] == "Banana"
+        assert self.calls == ["banana"]
+
+    def test_typo_shares_the_canonical_cache_entry(self):
+        self.cache.set("banana", {"products": [{"product_name": "Cached Banana"}]})
+
+        result = asyncio.run(food_search.search_food_by_name_async("Bananna"))
+        assert result["products"][0]["product_name"] == "Cached Banana"
+        assert self.calls == []
+
+
+class TestSearchFoodsBatch:
+    """search_foods_batch: dedupe, cache hits first, bounded fan-out."""
+
+    def setup_method(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cache = SearchCache(path="", ttl=food_search._CACHE_DURATION)
+
+        async def handler(request):
+            term = request.url.params["search_terms"]
+            self.calls.append(term)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.02)
+            self.in_flight -= 1
+            return httpx.Response(200, json={"products": [{"product_name": term.title()}]})
+
+        client = OpenFoodFactsClient(transport=httpx.MockTransport(handler), hedge_delay=5)
+        self.patches = [
+            patch.object(food_search, "off_client", client),
+            patch.object(food_search, "_cache", self.cache),
+            patch.object(food_search, "_async_search_flights", AsyncSingleFlight()),
+            patch.object(food_search, "SEARCH_BATCH_CONCURRENCY", 2),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+
+    def run_batch(self, names):
+        async def collect():
+            return [item async for item in food_search.search_foods_batch(names)]
+        return asyncio.run(collect())
+
+    def test_duplicates_and_typos_are_searched_once(self):
+        results = self.run_batch(["banana", "Banana ", "bananna", "apple", " "])
+
+        assert sorted(self.calls) == ["apple", "banana"]
+        by_queries = {tuple(queries): result for queries, result in results}
+        assert set(by_queries) == {("banana", "Banana ", "bananna"), ("apple",)}
+        assert by_queries[("banana", "Banana ", "bananna")]["products"][0]["product_name"] == "Banana"
+
+    def test_cache_hits_come_first_and_misses_are_bounded(self):
+        self.cache.set("salmon", {"products": [{"product_name": "Cached Salmon"}]})
+
+        results = self.run_batch(["rice", "beef", "salmon", "bread", "pasta", "pizza"])
+
+        assert results[0] == (["salmon"], {"products": [{"product_name": "Cached Salmon"}]})
+        assert len(results) == 6
+        assert "salmon" not in self.calls
+        assert self.max_in_flight == 2
+
+
+
+def test_blocking_catalog_query_does_not_stall_the_loop():
+    cache = SearchCache(path="", ttl=food_search._CACHE_DURATION)
+
+    def slow_catalog(food_name):
+        time.sleep(0.2)
+        return {"products": [{"product_name": "Banana"}]}
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        result = await food_search.search_food_by_name_async("banana")
+        ticking.cancel()
+        return result, ticks
+
+    with patch.object(food_search, "_cache", cache), patch.object(food_search, "_search_catalog", slow_catalog):
+        result, ticks = asyncio.run(run())
+
+    assert result["products"][0]["product_name"] == "Banana"
+    assert ticks >= 5
@@ -0,0 +1,45 @@
+from app.services.fuzzy_names import FuzzyNameIndex, edit_distance, get_name_index, normalize_name
+
+
+class TestFuzzyNameIndex:
+    def setup_method(self):
+        self.index = FuzzyNameIndex(["chicken", "chicken_breast", "banana", "yogurt", "beef", "ice_cream", "Crème Brûlée"])
+
+    def test_resolves_common_typos(self):
+        assert self.index.resolve("chiken") == "chicken"
+        assert self.index.resolve("Bananna") == "banana"
+        assert self.index.resolve("yoghurt") == "yogurt"
+        assert self.index.resolve("chiken breast") == "chicken breast"
+        assert self.index.resolve("icecream") == "ice cream"
+
+    def test_exact_names_are_normalized(self):
+        assert self.index.resolve("ICE_CREAM") == "ice cream"
+        assert self.index.resolve("creme brulee") == "creme brulee"
+        assert "Chicken Breast" in self.index
+
+    def test_unrelated_or_longer_queries_are_not_rewritten(self):
+        assert self.index.resolve("chicken soup") is None
+        assert self.index.resolve("beer") is None  # one edit from beef, but a different food
+        assert self.index.resolve("quinoa") is None
+        assert self.index.resolve("bef") is None  # too short to correct
+
+    def test_added_names_become_resolvable(self):
+        self.index.add_names(["Paneer Tikka", "paneer tikka"])
+        assert len(self.index) == 8
+        assert self.index.resolve("paner tikka") == "paneer tikka"
+
+
+def test_edit_distance_counts_transpositions_and_stops_at_limit():
+    assert edit_distance("chiken", "chicken", 2) == 1
+    assert edit_distance("appel", "apple", 2) == 1
+    assert edit_distance("chicken soup", "chicken", 2) == 3
+
+
+def test_normalize_name():
+    assert normalize_name("  Ice_Cream! ") == "ice cream"
+
+
+def test_default_index_covers_local_food_names():
+    index = get_name_index()
+    assert index.resolve("chiken") == "chicken"
+    assert index.resolve("brocoli") == "broccoli"
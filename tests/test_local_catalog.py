@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from app.services.local_catalog import LocalCatalog, build_catalog, iter_dump_products, product_from_off
+from app.services.search_cache import SearchCache
+
+
+def _product(name, code=None, calories=100):
+    product = {"product_name": name, "nutriments": {"energy-kcal_100g": calories}}
+    if code:
+        product["code"] = code
+    return product
+
+
+class TestLocalCatalog:
+    """Test cases for the FTS5 food catalog."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "food_catalog.db")
+        self.count = build_catalog([
+            _product("Banana chips"),
+            _product("Banana", code="111"),
+            _product("Banana bread with walnuts"),
+            _product("Crème fraîche"),
+            _product("Original Paneer Cheese", code="222"),
+            _product("Paneer duplicate", code="222"),  # same barcode, first one wins
+            _product("banana"),  # same name as the barcoded banana, but no barcode: kept
+        ], path=self.path)
+        self.catalog = LocalCatalog(self.path)
+
+    def teardown_method(self):
+        self.temp_dir.cleanup()
+
+    def test_uses_shared_relevance_scoring(self):
+        names = [product["product_name"] for product in self.catalog.search("banana")]
+        assert names[:2] == ["Banana", "banana"]
+        assert names[2] == "Banana chips"
+
+    def test_prefix_and_diacritic_insensitive(self):
+        assert self.catalog.search("panee")[0]["product_name"] == "Original Paneer Cheese"
+        assert self.catalog.search("creme")[0]["product_name"] == "Crème fraîche"
+
+    def test_partial_multi_word_match_is_a_miss(self):
+        assert self.catalog.search("banana bread")[0]["product_name"] == "Banana bread with walnuts"
+        assert self.catalog.search("banana juice") == []
+
+    def test_partial_match_falls_back_to_openfoodfacts(self):
+        from app.services import food_search
+
+        async def remote(*args, **kwargs):
+            return {"products": [{"product_name": "Banana juice"}]}
+
+        with patch.object(food_search, "local_catalog", self.catalog), \
+                patch.object(food_search, "_cache", SearchCache(path="")), \
+                patch.object(food_search.off_client, "search", remote):
+            result = asyncio.run(food_search.search_food_by_name_async("banana juice"))
+        assert result["products"][0]["product_name"] == "Banana juice"
+
+    def test_duplicate_barcodes_are_dropped(self):
+        assert self.count == 6
+        assert self.catalog.search("duplicate") == []
+
+    def test_missing_catalog_has_no_hits(self):
+        assert LocalCatalog(os.path.join(self.temp_dir.name, "missing.db")).search("banana") == []
+
+    def test_rebuild_is_picked_up(self):
+        assert self.catalog.search("quinoa") == []
+        os.utime(self.path, ns=(0, 0))  # make sure the rebuilt file's mtime differs
+        build_catalog([_product("Quinoa")], path=self.path)
+        assert self.catalog.search("quinoa")[0]["product_name"] == "Quinoa"
+
+    def test_food_search_answers_locally_first(self):
+        from app.services import food_search
+
+        async def fail_remote(*args, **kwargs):
+            raise AssertionError("remote search should not run on a local hit")
+
+        with patch.object(food_search, "local_catalog", self.catalog), \
+                patch.object(food_search.off_client, "search", fail_remote):
+            result = asyncio.run(food_search.search_food_by_name_async("Banana"))
+        assert result["products"][0]["product_name"] == "Banana"
+
+
+def test_dump_products_are_streamed_and_trimmed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "products.jsonl.gz")
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps({"product_name": "Oats", "code": "9", "nutriments": {"fat_100g": 7, "nova": 1},
+                                "images": {"front": "..."}}) + "\n")
+            f.write("{not json\n")
+            f.write(json.dumps({"product_name": ""}) + "\n")
+
+        products = list(iter_dump_products(path))
+    assert products == [product_from_off({"product_name": "Oats", "code": "9", "nutriments": {"fat_100g": 7}})]
+    assert "images" not in products[0]
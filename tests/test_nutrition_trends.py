@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from app.services.nutrition_trends import summarize_totals
+
+ROWS = [
+    (date(2025, 1, 1), 2000, 100, 200, 70),
+    (date(2025, 1, 3), 1500, 80, 150, 50),
+    (date(2025, 1, 8), 2100, 90, 250, 60),
+]
+GOALS = {"calories": 2000, "protein": 100, "carbs": 250, "fats": 70}
+
+
+def test_daily_periods_fill_unlogged_days():
+    summary = summarize_totals(ROWS, date(2025, 1, 1), date(2025, 1, 3))
+    periods = summary["periods"]
+
+    assert [p["period_start"] for p in periods] == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    assert periods[1]["logged_days"] == 0
+    assert periods[1]["daily_average"] is None
+    assert periods[1]["totals"]["calories"] == 0
+    # Rolling averages skip unlogged days
+    assert periods[2]["rolling_average"]["calories"] == 1750
+    assert summary["logged_days"] == 2
+    assert summary["goals"] is None and "goal_ratio" not in periods[0]
+
+
+def test_weeks_start_on_monday_and_report_goal_adherence():
+    summary = summarize_totals(ROWS, date(2024, 12, 30), date(2025, 1, 10), granularity="week", goals=GOALS)
+    first, second = summary["periods"]
+
+    assert (first["period_start"], first["period_end"]) == (date(2024, 12, 30), date(2025, 1, 5))
+    assert (second["period_start"], second["period_end"]) == (date(2025, 1, 6), date(2025, 1, 10))
+    assert first["totals"]["calories"] == 3500
+    assert first["daily_average"]["calories"] == 1750
+    assert first["goal_ratio"]["calories"] == pytest.approx(0.88, abs=0.01)
+    assert first["days_on_target"] == 1  # 2000 is on target, 1500 is not
+    assert second["days_on_target"] == 1  # 2100 is within 10%
+    assert summary["adherence"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_months_and_rolling_window_before_start():
+    summary = summarize_totals(ROWS, date(2025, 1, 3), date(2025, 2, 2), granularity="month", window=7)
+    january, february = summary["periods"]
+
+    assert january["period_start"] == date(2025, 1, 3)  # periods are clipped to the range
+    assert january["period_end"] == date(2025, 1, 31)
+    assert january["logged_days"] == 2  # Jan 1 is before start
+    assert february["totals"]["calories"] == 0
+
+    first_day = summarize_totals(ROWS, date(2025, 1, 3), date(2025, 1, 3))["periods"][0]
+    assert first_day["rolling_average"]["calories"] == 1750  # Jan 1 falls in the window
+
+
+def test_missing_goal_fields_are_null():
+    summary = summarize_totals(ROWS, date(2025, 1, 1), date(2025, 1, 1), goals={"calories": 2000, "protein": None})
+    ratio = summary["periods"][0]["goal_ratio"]
+    assert ratio["calories"] == 1.0
+    assert ratio["protein"] is None
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        summarize_totals(ROWS, date(2025, 1, 1), date(2025, 1, 3), granularity="year")
+    with pytest.raises(ValueError):
+        summarize_totals(ROWS, date(2025, 1, 3), date(2025, 1, 1))
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import httpx
+
+from app.services.openfoodfacts_client import OpenFoodFactsClient
+from app.services.upstream_health import UpstreamHealth
+
+ENDPOINTS = ("https://primary.test/cgi/search.pl", "https://mirror.test/cgi/search.pl")
+
+
+def _client(handler, **kwargs):
+    kwargs.setdefault("health", UpstreamHealth())
+    return OpenFoodFactsClient(endpoints=ENDPOINTS, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def _products(name):
+    return {"products": [{"product_name": name}]}
+
+
+def test_slow_primary_is_hedged_to_mirror():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "primary.test":
+            await asyncio.sleep(2)
+            return httpx.Response(200, json=_products("slow"))
+        return httpx.Response(200, json=_products("fast"))
+
+    client = _client(handler, hedge_delay=0.05)
+    started = time.monotonic()
+    data = asyncio.run(client.search({"search_terms": "banana"}, timeout=5))
+
+    assert data["products"][0]["product_name"] == "fast"
+    assert time.monotonic() - started < 1
+    assert calls == ["primary.test", "mirror.test"]
+
+
+def test_fast_primary_is_not_hedged():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        return httpx.Response(200, json=_products(request.url.host))
+
+    data = asyncio.run(_client(handler, hedge_delay=1).search({}, timeout=5))
+    assert data["products"][0]["product_name"] == "primary.test"
+    assert calls == ["primary.test"]
+
+
+def test_failed_primary_falls_through_immediately():
+    async def handler(request):
+        if request.url.host == "primary.test":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json=_products("mirror"))
+
+    started = time.monotonic()
+    data = asyncio.run(_client(handler, hedge_delay=3).search({}, timeout=5))
+    assert data["products"][0]["product_name"] == "mirror"
+    assert time.monotonic() - started < 1
+
+
+def test_empty_answer_is_not_hedged():
+    calls = []
+
+    async def empty(request):
+        calls.append(request.url.host)
+        return httpx.Response(200, json={"products": []})
+
+    assert asyncio.run(_client(empty, hedge_delay=0.5).search({}, timeout=5)) == {"products": []}
+    assert calls == ["primary.test"]
+
+
+def test_timed_out_search_returns_none():
+    async def hanging(request):
+        await asyncio.sleep(5)
+
+    assert asyncio.run(_client(hanging, hedge_delay=0.01).search({}, timeout=0.1)) is None
+
+
+def test_connection_pool_is_shared_across_searches():
+    async def handler(request):
+        return httpx.Response(200, json=_products("banana"))
+
+    client = _client(handler)
+
+    async def run():
+        await client.search({}, timeout=5)
+        first = client._client
+        await asyncio.gather(*(client.search({}, timeout=5) for _ in range(10)))
+        assert client._client is first
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_async_food_search_ranks_and_caches():
+    from unittest.mock import patch
+    from app.services import food_search
+    from app.services.search_cache import SearchCache
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["search_terms"])
+        return httpx.Response(200, json={"products": [
+            {"product_name": "Banana chips"}, {"product_name": "Banana"}, {"product_name": ""},
+        ]})
+
+    with patch.object(food_search, "off_client", _client(handler)), \
+            patch.object(food_search, "_cache", SearchCache(path="")):
+        first = asyncio.run(food_search.search_food_by_name_async("Banana "))
+        second = asyncio.run(food_search.search_food_by_name_async("banana"))
+
+    assert [p["product_name"] for p in first["products"]] == ["Banana", "Banana chips"]
+    assert second == first
+    assert calls == ["Banana "]
+
+
+def test_mirror_with_open_circuit_is_skipped():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "primary.test":
+            return httpx.Response(503)
+        return httpx.Response(200, json=_products("mirror"))
+
+    health = UpstreamHealth(failure_threshold=2, open_seconds=60)
+    client = _client(handler, hedge_delay=1, health=health)
+
+    async def run():
+        return [await client.search({}, timeout=5) for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert all(data["products"][0]["product_name"] == "mirror" for data in results)
+    assert calls.count("primary.test") == 2  # circuit opened after two 503s
+    assert health.host(ENDPOINTS[0]).state == "open"
@@ -0,0 +1,27 @@
+import random
+
+from app.services.ranking import NameRanker, fold_name, rank_products, score_product_name
+
+
+def test_vectorized_scores_match_reference():
+    random.seed(7)
+    words = ["banana", "chips", "white", "rice", "ban", "oat", "oats", "milk", "crème"]
+    names = ["  ".join(random.choice(words) for _ in range(random.randint(1, 4))) for _ in range(500)]
+    names += ["", "Banana", "BANANA CHIPS"]
+    ranker = NameRanker(names)
+
+    for query in ["banana", "white rice", "ban", "oat milk", "creme", "quinoa"]:
+        expected = [score_product_name(fold_name(name), fold_name(query)) if name else 0 for name in names]
+        assert ranker.scores(query).tolist() == expected
+
+
+def test_top_orders_by_score_then_input_order():
+    ranker = NameRanker(["Banana chips", "Banana", "Dried banana", "Banana bread", "Apple"])
+    assert [i for i, _ in ranker.top("banana", limit=3)] == [1, 0, 3]
+
+
+def test_rank_products_sets_serving_size():
+    products = [{"product_name": "Rice"}, {"product_name": ""}, {"product_name": "Rice pudding", "serving_size": "1 cup"}]
+    ranked = rank_products(products, "rice")
+    assert [p["product_name"] for p in ranked] == ["Rice", "Rice pudding"]
+    assert [p["serving_size"] for p in ranked] == ["100g", "1 cup"]
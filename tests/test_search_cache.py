@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+
+from app.services.search_cache import SearchCache
+
+
+def _cache(path, **kwargs):
+    return SearchCache(path=path, **kwargs)
+
+
+def test_entries_survive_restart():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "search_cache.db")
+        _cache(path).set("banana", {"products": [{"product_name": "Banana"}]})
+
+        restarted = _cache(path)
+        entry = restarted.get("banana")
+        assert entry.value["products"][0]["product_name"] == "Banana"
+        assert entry.is_fresh()
+        assert restarted.stats()["disk"]["hits"] == 1
+
+        # Promoted into memory: the second read doesn't touch SQLite
+        restarted.get("banana")
+        assert restarted.stats()["disk"]["hits"] == 1
+        assert restarted.stats()["memory"]["hits"] == 1
+
+
+def test_expired_entries_are_misses():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = _cache(os.path.join(temp_dir, "search_cache.db"), ttl=60)
+        cache.set("rice", {"products": []}, stored_at=time.time() - 120)
+        assert cache.get("rice") is None
+        assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_is_bounded():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = _cache(os.path.join(temp_dir, "search_cache.db"), memory_size=2, disk_entries=3)
+        for i in range(5):
+            cache.set(f"food {i}", {"products": []}, stored_at=time.time() + i)
+        cache.trim()
+
+        stats = cache.stats()
+        assert stats["memory"]["size"] == 2
+        assert stats["disk"]["size"] == 3
+        assert stats["evictions"] == 3 + 2
+        assert cache.get("food 0") is None
+        assert cache.get("food 4") is not None
+
+
+def test_memory_only_when_disabled():
+    cache = _cache("")
+    cache.set("dal", {"products": []})
+    assert cache.get("dal") is not None
+    assert cache.stats()["disk"]["path"] is None
+
+
+def test_stale_window_and_per_entry_ttl():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "search_cache.db")
+        cache = _cache(path, ttl=60, stale_ttl=300)
+        cache.set("rice", {"products": ["rice"]}, stored_at=time.time() - 120)
+        cache.set("ricee", {"products": []}, stored_at=time.time() - 120, ttl=10)
+        cache.set("dal", {"products": []}, stored_at=time.time() - 1000)
+
+        entry = cache.get("rice")
+        assert entry is not None and not entry.is_fresh()
+        assert cache.get("ricee").ttl == 10
+        assert cache.get("dal") is None
+        assert cache.stats()["stale_hits"] == 2
+
+        # Per-entry TTLs survive the round trip through SQLite
+        restarted = _cache(path, ttl=60, stale_ttl=300)
+        assert restarted.get("ricee").ttl == 10
+        restarted.trim()
+        assert restarted.stats()["disk"]["size"] == 2
+
+
+def test_upgrades_cache_files_without_ttl_column():
+    import sqlite3
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "search_cache.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE search_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                     "stored_at REAL NOT NULL, last_access REAL NOT NULL)")
+        conn.execute("INSERT INTO search_cache VALUES ('oats', '{\"products\": []}', ?, ?)", (time.time(), time.time()))
+        conn.commit()
+        conn.close()
+
+        entry = _cache(path, ttl=60).get("oats")
+        assert entry.ttl == 60
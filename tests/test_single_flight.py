@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services.single_flight import SingleFlight, AsyncSingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    executions = []
+    results = []
+
+    def slow_search():
+        executions.append(1)
+        time.sleep(0.1)
+        return {"products": ["banana"]}
+
+    threads = [threading.Thread(target=lambda: results.append(flights.do("banana", slow_search))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert results == [{"products": ["banana"]}] * 8
+    assert flights.stats() == {"calls": 1, "shared": 7, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flights.do("rice", failing)
+    assert flights.do("rice", lambda: "ok") == "ok"
+
+
+def test_async_calls_share_one_task():
+    flights = AsyncSingleFlight()
+    executions = []
+
+    async def slow_search():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return {"products": ["dal"]}
+
+    async def run():
+        return await asyncio.gather(*(flights.do("dal", slow_search) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert len(executions) == 1
+    assert all(result == {"products": ["dal"]} for result in results)
+    assert flights.stats()["shared"] == 19
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = AsyncSingleFlight()
+
+    async def slow_search():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do("oats", slow_search))
+        follower = asyncio.ensure_future(flights.do("oats", slow_search))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_concurrent_food_searches_hit_upstream_once():
+    from app.services import food_search
+    from app.services.openfoodfacts_client import OpenFoodFactsClient
+    from app.services.search_cache import SearchCache
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.host)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"products": [{"product_name": "Paneer"}]})
+
+    client = OpenFoodFactsClient(transport=httpx.MockTransport(handler), hedge_delay=5)
+
+    async def run():
+        return await asyncio.gather(*(food_search.search_food_by_name_async("paneer") for _ in range(25)))
+
+    with patch.object(food_search, "off_client", client), \
+            patch.object(food_search, "_cache", SearchCache(path="")), \
+            patch.object(food_search, "_async_search_flights", AsyncSingleFlight()):
+        results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result["products"][0]["product_name"] == "Paneer" for result in results)
@@ -0,0 +1,92 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from app.services.upstream_health import CircuitOpenError, HostHealth, UpstreamHealth
+
+
+class TestHostHealth:
+    def setup_method(self):
+        self.health = HostHealth("api.test", failure_threshold=3, open_seconds=0.05, min_timeout=0.5)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.health.record_failure()
+        assert self.health.allow()
+        self.health.record_failure()
+
+        assert self.health.state == "open"
+        assert not self.health.available()
+        assert not self.health.allow()
+        assert self.health.rejected == 1
+
+    def test_success_resets_failure_count(self):
+        self.health.record_failure()
+        self.health.record_failure()
+        self.health.record_success(0.1)
+        self.health.record_failure()
+        assert self.health.state == "closed"
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(3):
+            self.health.record_failure()
+        time.sleep(0.06)
+
+        assert self.health.available()
+        assert self.health.allow()
+        assert self.health.state == "half_open"
+        assert not self.health.allow()  # probe already in flight
+
+        self.health.record_success(0.2)
+        assert self.health.state == "closed"
+        assert self.health.allow()
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.health.record_failure()
+        time.sleep(0.06)
+        assert self.health.allow()
+
+        self.health.record_failure()
+        assert self.health.state == "open"
+        assert not self.health.allow()
+
+    def test_timeout_follows_latency_percentile(self):
+        assert self.health.timeout(5.0) == 5.0  # too few samples yet
+        for _ in range(50):
+            self.health.record_success(0.8)
+        assert self.health.timeout(5.0) == pytest.approx(1.6)
+        assert self.health.timeout(1.0) == 1.0  # never above the caller's timeout
+
+        for _ in range(200):
+            self.health.record_success(0.01)
+        assert self.health.timeout(5.0) == 0.5  # min_timeout floor
+
+
+class TestUpstreamHealthGet:
+    def setup_method(self):
+        self.upstream = UpstreamHealth(failure_threshold=2, open_seconds=60)
+        self.session = MagicMock()
+
+    def test_records_results_per_host(self):
+        self.session.get.return_value = MagicMock(status_code=200)
+        self.upstream.get("https://a.test/x", timeout=5, session=self.session)
+        self.session.get.return_value = MagicMock(status_code=500)
+        self.upstream.get("https://b.test/x", timeout=5, session=self.session)
+
+        stats = self.upstream.stats()
+        assert stats["a.test"]["successes"] == 1
+        assert stats["b.test"]["failures"] == 1
+        assert self.session.get.call_args.kwargs["timeout"] == 5
+
+    def test_open_circuit_fails_fast(self):
+        self.session.get.side_effect = requests.ConnectionError("down")
+        for _ in range(2):
+            with pytest.raises(requests.ConnectionError):
+                self.upstream.get("https://a.test/x", timeout=5, session=self.session)
+
+        with pytest.raises(CircuitOpenError):
+            self.upstream.get("https://a.test/y", timeout=5, session=self.session)
+        assert self.session.get.call_count == 2